@@ -1,136 +1,409 @@
 import os
-from dotenv import load_dotenv
-import argparse
+import sys
 import time
+import itertools
 import random
-import google.generativeai as genai
+import argparse
+from dotenv import load_dotenv
 
-# Import from new modules
-from serp_config import CITIES, KEYWORDS
-from modules.serp_client import serpapi_extractor, serpapi_gbp_extractor
-from modules.utils import clean_and_deduplicate
-from modules.crawler import run_on_page_audit
-from modules.reporting import create_final_report
+# Heavy dependencies (pandas, bs4, serpapi, google.generativeai) are imported
+# inside each stage so a subcommand only pays for what it actually uses.
+from modules.artifacts import DEFAULT_WORKDIR, SERP_ARTIFACT, AUDIT_ARTIFACT, artifact_path, save_records, load_records
+from modules.constants import SIMHASH_MAX_DISTANCE, SIMHASH_BITS
+from modules.costs import CostLedger, COSTS_ARTIFACT
+from modules.contact_discovery import CONTACT_CACHE_ARTIFACT
+from modules import replay
+from modules.replay import pause
+from modules.profiling import profile_stage, PROFILE_DIR
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Initialize Gemini Client (Global configuration for modules that might need it implicitly, 
-# though ai_engine handles its own model instantiation, configuring it globally is good practice)
-GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-else:
-    print("[WARNING] GEMINI_API_KEY not found in .env")
+STAGES = ['serp', 'audit', 'report', 'all']
 
-# Global data list to store results
-results_data = []
 
-if __name__ == '__main__':
-    
-    # 1. Load API Key
-    SERPAPI_API_KEY = os.environ.get("SERPAPI_API_KEY")
-    if not SERPAPI_API_KEY:
-        print("\n[ERROR] SERPAPI_API_KEY environment variable not found.")
-        print("Please set the variable before running the script (e.g., export SERPAPI_API_KEY='YOUR_KEY').")
-        exit()
+def _timed_import(stage_name, loader):
+    """Runs a stage's import block and prints how long it took (startup cost tracking)."""
+    start = time.perf_counter()
+    loaded = loader()
+    elapsed = time.perf_counter() - start
+    print(f"-> [{stage_name}] Dependencies loaded in {elapsed:.2f}s")
+    return loaded
+
+
+def run_serp_stage(start_page, end_page, api_key, ledger, queries, profiler=None):
+    """
+    Stage 1: SERP extraction + GBP enrichment over a lazily generated query stream.
+    Queries are processed in batches; inside a batch pages are fetched breadth-first
+    (page N of every query before page N+1), so a capped SerpApi budget is spent on
+    the highest-value results first.
+    Returns raw result rows with the GBP fields of their keyword/city query attached.
+    """
+    def _load():
+        from modules.serp_client import serpapi_extractor, serpapi_gbp_extractor, GBP_DEFAULTS
+        from modules.queries import iter_batches
+        return serpapi_extractor, serpapi_gbp_extractor, GBP_DEFAULTS, iter_batches
+
+    serpapi_extractor, serpapi_gbp_extractor, GBP_DEFAULTS, iter_batches = _timed_import('serp', _load)
+
+    results_data = []
+    query_count = 0
+
+    print("\n--- STARTING SERPAPI EXTRACTION ---")
+    for batch in iter_batches(queries):
+        if not ledger.can_search():
+            break
+
+        query_count += len(batch)
+        batch_results = []
+        active_queries = batch
+        queries_with_results = []
+
+        with profile_stage(profiler, 'serp_extraction'):
+            for page in range(start_page, end_page + 1):
+                still_active = []
+
+                for keyword, city in active_queries:
+                    if not ledger.can_search():
+                        break
+
+                    print(f"\n[QUERY] Targeting: '{keyword} {city}' (Page {page}/{end_page})")
+
+                    harvested_data = serpapi_extractor(
+                        keyword,
+                        city,
+                        page,
+                        page,
+                        api_key,
+                        ledger=ledger
+                    )
+                    batch_results.extend(harvested_data)
+
+                    # A query with no results on this page has nothing deeper either
+                    if harvested_data:
+                        still_active.append((keyword, city))
+                        if (keyword, city) not in queries_with_results:
+                            queries_with_results.append((keyword, city))
+
+                active_queries = still_active
+                if not ledger.can_search():
+                    print(f"\n-> SerpApi credit budget reached ({ledger.serp_credits_used}/{ledger.max_serp_credits}). Stopping SERP extraction.")
+                    break
+
+        # Queries whose GBP lookup is skipped (credit budget) keep the "no GBP data" values, not NaN
+        for row in batch_results:
+            for key, value in GBP_DEFAULTS.items():
+                row.setdefault(key, value)
+
+        # GBP audit runs once per Keyword/City combination, then applies to all rows for that query
+        with profile_stage(profiler, 'gbp'):
+            print("\n--- GBP DATA COLLECTION (batch) ---")
+            for keyword, city in queries_with_results:
+                if not ledger.can_search():
+                    print("-> SerpApi credit budget reached. Skipping remaining GBP lookups.")
+                    break
 
-    # 2. Parse Command-Line Arguments
-    parser = argparse.ArgumentParser(description="SEO Prospect Agent: Scrapes SERPs and audits prospects.")
-    parser.add_argument('start_page', type=int, help='The starting Google SERP page number (e.g., 2).')
-    parser.add_argument('end_page', type=int, help='The ending Google SERP page number (e.g., 5).')
-    args = parser.parse_args()
-    
-    start_page = args.start_page
-    end_page = args.end_page
-    
-    if start_page < 1 or end_page < 1 or start_page > end_page:
-        print("[ERROR] Invalid page range. Start page must be >= 1 and Start page <= End page.")
-        exit()
-    
-    try:
-        print("\n--- STARTING SERPAPI EXTRACTION ---")
-        
-        # 3. SerpApi Extractor Logic
-        for city in CITIES:
-            for keyword in KEYWORDS:
-                
-                print(f"\n[QUERY] Targeting: '{keyword} {city}' (Pages {start_page}-{end_page})")
-                
-                harvested_data = serpapi_extractor(
-                    keyword, 
-                    city, 
-                    start_page, 
-                    end_page, 
-                    SERPAPI_API_KEY
-                )
-                results_data.extend(harvested_data)
-                
-        
-        print("\n--- SERP EXTRACTION COMPLETE ---")
-        print(f"Total raw results collected: {len(results_data)}")
-        
-        # 4. Data Cleaning and Deduplication
-        print("\n--- STARTING DATA CLEANUP ---")
-        cleaned_df = clean_and_deduplicate(results_data) 
-        print(f"Total unique URLs after cleaning: {cleaned_df.shape[0]}")
-        
-        # 4.5 GBP Data Collection
-        print("\n--- STARTING GBP DATA COLLECTION ---")
-        gbp_place_ids = []
-        gbp_ratings = []
-        gbp_reviews = []
-        
-        # Run GBP audit once per Keyword/City combination, then apply to all rows for that query
-        for city in CITIES:
-            for keyword in KEYWORDS:
                 print(f"-> Fetching GBP data for: '{keyword} {city}'")
-                
-                # Fetch GBP data
-                gbp_results = serpapi_gbp_extractor(keyword, city, SERPAPI_API_KEY)
-                
-                # Identify all rows belonging to the current keyword/city pair
-                mask = (cleaned_df['Keyword'] == keyword) & (cleaned_df['City'] == city)
-                
-                # Apply the fetched GBP data to all matching rows
-                cleaned_df.loc[mask, 'GBP_Place_ID'] = gbp_results['GBP_Place_ID']
-                cleaned_df.loc[mask, 'GBP_Rating'] = gbp_results['GBP_Rating']
-                cleaned_df.loc[mask, 'GBP_Review_Count'] = gbp_results['GBP_Review_Count']
-                
-        print("--- GBP DATA COLLECTION COMPLETE ---")
-        
-        # 5. On-Page Auditor
-        if not cleaned_df.empty:
-            print("\nReady to begin On-Page Auditing of unique prospects.")
-            
-            cleaned_df['Email_Address'] = 'N/A'
-            cleaned_df['H1_Audit_Result'] = 'Fail: Not Audited'
-            cleaned_df['NAP_Audit_Result'] = 'Fail: Not Audited'
-            
-            # Loop through rows
-            for index, row in cleaned_df.iterrows():
-                url = row['URL']
-                print(f"-> Auditing {index+1}/{cleaned_df.shape[0]}: {url}") 
-                
-                audit_results = run_on_page_audit(url, row['Keyword'], row['City'])
-                
-                # Append the results dictionary along with the original row data
+                gbp_results = serpapi_gbp_extractor(keyword, city, api_key, ledger=ledger)
+
+                for row in batch_results:
+                    if row['Keyword'] == keyword and row['City'] == city:
+                        row.update(gbp_results)
+
+        results_data.extend(batch_results)
+
+    print("\n--- SERP EXTRACTION COMPLETE ---")
+    print(f"Queries processed: {query_count}")
+    print(f"Total raw results collected: {len(results_data)}")
+    return results_data
+
+
+def run_audit_stage(results_data, max_simhash_distance=SIMHASH_MAX_DISTANCE, target_leads=None, workers=1,
+                    contact_cache_path=None, profiler=None):
+    """
+    Stage 2: Cleanup/deduplication + On-Page audit of the unique prospects.
+    Prospects are audited in expected-yield order and the stage stops once
+    `target_leads` prospects with an email were found.
+    Contact pages found per domain are cached in contact_cache_path for later runs.
+    Returns the audited DataFrame.
+    """
+    def _load():
+        from modules.utils import clean_and_deduplicate
+        from modules.crawler import run_on_page_audit, fetch_contact_page
+        from modules.fingerprint import SimHashIndex
+        from modules.scheduler import prioritize_prospects, run_scheduled_audits
+        from modules.contact_discovery import ContactDiscovery
+        return (clean_and_deduplicate, run_on_page_audit, fetch_contact_page, SimHashIndex,
+                prioritize_prospects, run_scheduled_audits, ContactDiscovery)
+
+    (clean_and_deduplicate, run_on_page_audit, fetch_contact_page, SimHashIndex,
+     prioritize_prospects, run_scheduled_audits, ContactDiscovery) = _timed_import('audit', _load)
+    fingerprint_index = SimHashIndex(max_distance=max_simhash_distance)
+    contact_discovery = ContactDiscovery(fetch_contact_page, cache_path=contact_cache_path)
+
+    print("\n--- STARTING DATA CLEANUP ---")
+    with profile_stage(profiler, 'cleaning'):
+        cleaned_df = clean_and_deduplicate(results_data)
+    print(f"Total unique URLs after cleaning: {cleaned_df.shape[0]}")
+
+    if cleaned_df.empty:
+        return cleaned_df
+
+    print("\nReady to begin On-Page Auditing of unique prospects.")
+
+    cleaned_df = prioritize_prospects(cleaned_df, contact_discovery.known_domains())
+    cleaned_df['Email_Address'] = 'N/A'
+    cleaned_df['H1_Audit_Result'] = 'Fail: Not Audited'
+    cleaned_df['NAP_Audit_Result'] = 'Fail: Not Audited'
+    cleaned_df['Error_Status'] = 'Skipped: Not Audited'
+
+    started = itertools.count(1)
+    total = cleaned_df.shape[0]
+
+    def _audit(row, cancel_event):
+        print(f"-> Auditing {next(started)}/{total}: {row['URL']}")
+        url_timer = profiler.url_timer(row['URL']) if profiler is not None else None
+        try:
+            audit_results = run_on_page_audit(
+                row['URL'],
+                row['Keyword'],
+                row['City'],
+                fingerprint_index=fingerprint_index,
+                cancel_event=cancel_event,
+                contact_discovery=contact_discovery,
+                url_timer=url_timer
+            )
+        finally:
+            if url_timer is not None:
+                url_timer.finish()
+        pause(random.uniform(0.5, 1.5))
+        return audit_results
+
+    with profile_stage(profiler, 'audit'):
+        audited = 0
+        try:
+            for index, audit_results in run_scheduled_audits(cleaned_df, _audit, target_leads, workers):
                 # Merge the audit results back into the DataFrame row
                 for key, value in audit_results.items():
-                    # Use a conditional assignment to set the column data
-                    # This is slightly more verbose but avoids pre-creating 
-                    # dozens of empty lists and appending to them one by one.
                     cleaned_df.loc[index, key] = value
-                
-                time.sleep(random.uniform(0.5, 1.5))
-                
-            print("\n--- ON-PAGE AUDIT COMPLETE ---")
-                
-        # 6. Data Consolidation & Reporting
-        create_final_report(cleaned_df)
-            
+                audited += 1
+        finally:
+            contact_discovery.save()
+            contact_discovery.close()
+
+    print(f"\n--- ON-PAGE AUDIT COMPLETE ({audited}/{total} audited) ---")
+    return cleaned_df
+
+
+def run_report_stage(audited_df, ledger, target_leads=None, profiler=None):
+    """Stage 3: Rule-based scoring, Gemini campaign generation and CSV/XLSX export."""
+    def _load():
+        import google.generativeai as genai
+        from modules.reporting import create_final_report
+        return genai, create_final_report
+
+    genai, create_final_report = _timed_import('report', _load)
+
+    # Gemini is only configured when the run actually reaches the AI stage
+    gemini_api_key = os.environ.get("GEMINI_API_KEY")
+    if gemini_api_key:
+        genai.configure(api_key=gemini_api_key)
+    elif not replay.is_replaying():
+        print("[WARNING] GEMINI_API_KEY not found in .env")
+
+    # Re-running the report replaces the previous report's Gemini spend instead of adding to it
+    ledger.reset_tokens('ai')
+    create_final_report(audited_df, ledger, target_leads, profiler)
+
+
+def _load_audited_df(path):
+    """Rebuilds the audited DataFrame from the audit artifact."""
+    records = load_records(path)
+    if records is None:
+        return None
+
+    import pandas as pd
+    return pd.DataFrame(records)
+
+
+def _simhash_distance(value):
+    """argparse type for --max-simhash-distance (each of the distance + 1 bands needs at least one bit)."""
+    try:
+        distance = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if not 0 <= distance < SIMHASH_BITS:
+        raise argparse.ArgumentTypeError(f"must be between 0 and {SIMHASH_BITS - 1}, got {distance}")
+    return distance
+
+
+def _positive_int(value):
+    """argparse type for counts that must be at least 1 (--workers, --target-leads)."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="SEO Prospect Agent: Scrapes SERPs and audits prospects.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    stage_help = {
+        'serp': 'Fetch SERP + GBP data and save it to the working directory.',
+        'audit': 'Clean and audit the saved SERP results.',
+        'report': 'Generate AI campaigns and export CSV/XLSX from the saved audit.',
+        'all': 'Run every stage in sequence.',
+    }
+
+    for stage in STAGES:
+        sub = subparsers.add_parser(stage, help=stage_help[stage])
+        if stage in ('serp', 'all'):
+            sub.add_argument('start_page', type=int, help='The starting Google SERP page number (e.g., 2).')
+            sub.add_argument('end_page', type=int, help='The ending Google SERP page number (e.g., 5).')
+            sub.add_argument('--max-serp-credits', type=int, default=None,
+                             help='Stop SerpApi extraction once this many searches (retries included) were made.')
+            sub.add_argument('--queries', metavar='FILE', default=None,
+                             help='CSV (keyword,city columns), JSONL/NDJSON or JSON array file of queries. Defaults to serp_config.py.')
+            sub.add_argument('--keywords', metavar='FILE', default=None,
+                             help='Keyword file (one per line), crossed with --cities.')
+            sub.add_argument('--cities', metavar='FILE', default=None,
+                             help='City file (one per line), crossed with --keywords.')
+            sub.add_argument('--shard', metavar='I/N', default=None,
+                             help='Only run shard I of N of the query grid (e.g., 2/4).')
+        if stage in ('audit', 'all'):
+            sub.add_argument('--max-simhash-distance', type=_simhash_distance, default=SIMHASH_MAX_DISTANCE,
+                             help=f'Max differing SimHash bits (0-{SIMHASH_BITS - 1}) for two sites to count as clones (default: {SIMHASH_MAX_DISTANCE}).')
+            sub.add_argument('--workers', type=_positive_int, default=1,
+                             help='Number of prospects audited concurrently (default: 1).')
+        if stage in ('audit', 'report', 'all'):
+            sub.add_argument('--target-leads', type=_positive_int, default=None,
+                             help='Stop auditing/generating once this many actionable leads with email are found.')
+        if stage in ('report', 'all'):
+            sub.add_argument('--max-ai-tokens', type=int, default=None,
+                             help='Stop campaign generation once this many Gemini tokens (input + output) were used.')
+        sub.add_argument('--workdir', default=DEFAULT_WORKDIR,
+                         help=f'Directory for intermediate artifacts (default: {DEFAULT_WORKDIR}).')
+        sub.add_argument('--profile', action='store_true',
+                         help=f'Profile each stage (cProfile + tracemalloc) into <workdir>/{PROFILE_DIR}/.')
+        sub.add_argument('--profile-url-sample', type=float, default=0.1,
+                         help='Fraction of audited URLs that get per-phase timings with --profile (default: 0.1).')
+        sub.add_argument('--record', metavar='DIR', default=None,
+                         help='Record every SerpApi, website and Gemini response to an archive in DIR.')
+        sub.add_argument('--replay', metavar='DIR', default=None,
+                         help='Run offline, answering every external request from the archive in DIR.')
+
+    return parser
+
+
+if __name__ == '__main__':
+
+    # Backwards compatibility: `python agent.py 2 5` runs the full pipeline
+    if len(sys.argv) > 1 and sys.argv[1].isdigit():
+        sys.argv.insert(1, 'all')
+
+    # 1. Parse Command-Line Arguments
+    args = build_parser().parse_args()
+
+    serp_path = artifact_path(args.workdir, SERP_ARTIFACT)
+    audit_path = artifact_path(args.workdir, AUDIT_ARTIFACT)
+    costs_path = artifact_path(args.workdir, COSTS_ARTIFACT)
+
+    # A new SERP run starts a fresh cost ledger; later stages add to the existing one
+    budgets = {
+        'max_serp_credits': getattr(args, 'max_serp_credits', None),
+        'max_ai_tokens': getattr(args, 'max_ai_tokens', None),
+    }
+    if args.command in ('serp', 'all'):
+        ledger = CostLedger(**budgets)
+    else:
+        ledger = CostLedger.load(costs_path, **budgets)
+
+    # Profiling is opt-in: without --profile the stages run with no-op contexts
+    profiler = None
+    if args.profile:
+        from modules.stage_profiler import StageProfiler
+        profiler = StageProfiler(os.path.join(args.workdir, PROFILE_DIR), url_sample_rate=args.profile_url_sample)
+
+    # 2. Record/Replay Mode
+    try:
+        replay.configure(record_dir=args.record, replay_dir=args.replay)
+    except (ValueError, FileNotFoundError, FileExistsError) as e:
+        print(f"\n[ERROR] {e}")
+        exit()
+
+    # 3. Validate SERP inputs (only the stages that hit SerpApi need them, never needed offline)
+    if args.command in ('serp', 'all'):
+        SERPAPI_API_KEY = os.environ.get("SERPAPI_API_KEY", "replay" if replay.is_replaying() else None)
+        if not SERPAPI_API_KEY:
+            print("\n[ERROR] SERPAPI_API_KEY environment variable not found.")
+            print("Please set the variable before running the script (e.g., export SERPAPI_API_KEY='YOUR_KEY').")
+            exit()
+
+        if args.start_page < 1 or args.end_page < 1 or args.start_page > args.end_page:
+            print("[ERROR] Invalid page range. Start page must be >= 1 and Start page <= End page.")
+            exit()
+
+        if args.queries and (args.keywords or args.cities):
+            print("[ERROR] Use either --queries or --keywords/--cities, not both.")
+            exit()
+        if bool(args.keywords) != bool(args.cities):
+            print("[ERROR] --keywords and --cities must be given together.")
+            exit()
+
+        missing_files = [path for path in (args.queries, args.keywords, args.cities) if path and not os.path.isfile(path)]
+        if missing_files:
+            print(f"[ERROR] Query file not found: {', '.join(missing_files)}")
+            exit()
+
+        from modules.queries import iter_queries, parse_shard
+        try:
+            shard = parse_shard(args.shard) if args.shard else None
+        except ValueError as e:
+            print(f"[ERROR] {e}")
+            exit()
+
+        queries = iter_queries(args.queries, args.keywords, args.cities, shard)
+
+    try:
+        # 4. SERP Stage
+        if args.command in ('serp', 'all'):
+            results_data = run_serp_stage(args.start_page, args.end_page, SERPAPI_API_KEY, ledger, queries, profiler)
+            save_records(serp_path, results_data)
+
+        # 5. Audit Stage
+        if args.command in ('audit', 'all'):
+            results_data = load_records(serp_path)
+            if results_data is None:
+                exit()
+
+            audited_df = run_audit_stage(
+                results_data,
+                args.max_simhash_distance,
+                args.target_leads,
+                args.workers,
+                contact_cache_path=artifact_path(args.workdir, CONTACT_CACHE_ARTIFACT),
+                profiler=profiler
+            )
+            save_records(audit_path, audited_df.to_dict(orient='records'))
+
+        # 6. Report Stage
+        if args.command in ('report', 'all'):
+            audited_df = _load_audited_df(audit_path)
+            if audited_df is None:
+                exit()
+
+            run_report_stage(audited_df, ledger, args.target_leads, profiler)
+
     except Exception as e:
         print(f"\n[FATAL ERROR] An error occurred: {e}")
-        
+
     finally:
-        pass
\ No newline at end of file
+        # Keep the spend (and recorded responses) of a crashed run too
+        ledger.save(costs_path)
+        replay.close()
+        if profiler is not None:
+            profiler.write_reports()
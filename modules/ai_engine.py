@@ -1,11 +1,155 @@
 import google.generativeai as genai
+import re
 import json
+from types import SimpleNamespace
+from .replay import through_archive, error_factory, pause
 
+CAMPAIGN_FIELDS = ['subject_1', 'body_1', 'subject_2', 'body_2', 'subject_3', 'body_3']
 
-def generate_ai_campaign(row):
+# (min_chars, max_chars) per field type
+FIELD_LENGTH_LIMITS = {
+    'subject': (5, 120),
+    'body': (80, 3000),
+}
+
+# Follow-up requests allowed to fix invalid fields before the campaign is dropped
+MAX_REPAIR_ATTEMPTS = 2
+
+# Retries of a Gemini request failing with a transient error (rate limit, timeout, network)
+MAX_API_RETRIES = 3
+API_RETRY_BASE_DELAY = 5  # seconds, doubled on every retry
+
+# Matched by class name so errors rebuilt from a replay archive are retried the same way
+TRANSIENT_API_ERRORS = {
+    'ResourceExhausted', 'TooManyRequests', 'ServiceUnavailable', 'DeadlineExceeded',
+    'InternalServerError', 'GatewayTimeout', 'RetryError',
+    'ConnectionError', 'Timeout', 'TimeoutError', 'ReadTimeout', 'ConnectTimeout',
+}
+
+# Validation counters for the run summary
+CAMPAIGN_STATS = {
+    'campaigns': 0,
+    'valid_first_try': 0,
+    'repaired': 0,
+    'failed': 0,
+    'invalid_fields': 0,
+    'repair_requests': 0,
+    'api_retries': 0,
+    'api_errors': 0,
+}
+
+
+def _response_schema(fields):
+    """Structured-output schema for Gemini: an object with the given string keys, all required."""
+    return {
+        "type": "object",
+        "properties": {field: {"type": "string"} for field in fields},
+        "required": list(fields),
+    }
+
+
+def validate_campaign(campaign, fields=CAMPAIGN_FIELDS) -> dict:
+    """
+    Checks each field against the schema (present, string, non-empty, length limits).
+    Returns {field: reason} for the invalid fields; empty dict means valid.
+    """
+    errors = {}
+    for field in fields:
+        value = campaign.get(field) if isinstance(campaign, dict) else None
+        min_chars, max_chars = FIELD_LENGTH_LIMITS[field.split('_')[0]]
+
+        if not isinstance(value, str):
+            errors[field] = "missing"
+            continue
+
+        value = value.strip()
+        if not value or value in ('...', 'Error', 'Error generating'):
+            errors[field] = "empty"
+        elif len(value) < min_chars:
+            errors[field] = f"too short ({len(value)} chars, min {min_chars})"
+        elif len(value) > max_chars:
+            errors[field] = f"too long ({len(value)} chars, max {max_chars})"
+    return errors
+
+
+def _encode_response(response):
+    try:
+        text = response.text
+    except ValueError: # Blocked/empty candidates have no text
+        text = None
+    usage = getattr(response, 'usage_metadata', None)
+    return {
+        'text': text,
+        'prompt_token_count': getattr(usage, 'prompt_token_count', 0),
+        'candidates_token_count': getattr(usage, 'candidates_token_count', 0),
+    }
+
+
+def _decode_response(data):
+    return SimpleNamespace(
+        text=data['text'],
+        usage_metadata=SimpleNamespace(
+            prompt_token_count=data['prompt_token_count'],
+            candidates_token_count=data['candidates_token_count']
+        )
+    )
+
+
+def _request_fields(prompt, fields, row, ledger=None) -> dict:
+    """
+    Sends one structured-output request and returns the parsed JSON (empty dict on bad JSON).
+    Transient API errors are retried with exponential backoff; other errors are raised.
+    Token usage reported by Gemini is charged to the optional CostLedger.
+    """
+    model_name = 'gemini-2.5-flash'
+    generation_config = {
+        "response_mime_type": "application/json",
+        "response_schema": _response_schema(fields),
+    }
+
+    # Recorded/replayed when an archive is configured (keyed by model, prompt and requested fields)
+    for attempt in range(MAX_API_RETRIES + 1):
+        try:
+            response = through_archive(
+                'gemini',
+                json.dumps({'model': model_name, 'prompt': prompt, 'fields': list(fields)}),
+                lambda: genai.GenerativeModel(model_name).generate_content(prompt, generation_config=generation_config),
+                _encode_response,
+                _decode_response,
+                error_factory()
+            )
+            break
+        except Exception as e:
+            if e.__class__.__name__ not in TRANSIENT_API_ERRORS or attempt == MAX_API_RETRIES:
+                raise
+            delay = API_RETRY_BASE_DELAY * 2 ** attempt
+            print(f"-> Gemini {e.__class__.__name__}. Retrying in {delay}s (Attempt {attempt+1}/{MAX_API_RETRIES})...")
+            CAMPAIGN_STATS['api_retries'] += 1
+            pause(delay)
+
+    usage = getattr(response, 'usage_metadata', None)
+    if ledger is not None and usage is not None:
+        ledger.record_tokens(
+            'ai',
+            row.get('URL', ''),
+            row.get('Keyword', ''),
+            row.get('City', ''),
+            getattr(usage, 'prompt_token_count', 0),
+            getattr(usage, 'candidates_token_count', 0)
+        )
+
+    try:
+        data = json.loads(response.text)
+    except (ValueError, TypeError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def generate_ai_campaign(row, ledger=None):
     """
     Uses Google Gemini (2.5 Flash) to generate a 3-email sequence.
-    Returns a dictionary with Email_1, Email_2, and Email_3.
+    Returns a dictionary with subject_1/body_1 ... subject_3/body_3,
+    or None if the output could not be validated or the API kept failing (so it never gets exported).
     """
     # 1. Prepare Data
     company = row.get('Company_Name', 'Business Owner')
@@ -13,26 +157,28 @@ def generate_ai_campaign(row):
     gbp_rating = row.get('GBP_Rating', 0)
     h1_status = row.get('H1_Audit_Result', 'Unknown')
     nap_status = row.get('NAP_Audit_Result', 'Unknown')
-    
-    # 2. Define the Prompt
-    prompt = f"""
-    You are a top-tier SEO Sales Copywriter for a top-tier SEO agency. 
-    Your goal is to write a 3-email cold outreach sequence for a local business.
-    
+
+    prospect_details = f"""
     PROSPECT DETAILS:
     - Business: {company} in {city}
     - Google Maps Rating: {gbp_rating} stars.
     - Audit Issues: Main Heading (H1): "{h1_status}", Contact Info (NAP): "{nap_status}".
-    
+    """
+
+    # 2. Define the Prompt
+    prompt = f"""
+    You are a top-tier SEO Sales Copywriter for a top-tier SEO agency.
+    Your goal is to write a 3-email cold outreach sequence for a local business.
+    {prospect_details}
     STRATEGY:
-    1. Email 1 (The Hook): 
+    1. Email 1 (The Hook):
         - If Audit Issues are "Fail": Warn that technical errors are hurting their rankings.
         - If Audit Issues are "Pass": Praise their foundation but warn that they need "Authority/Backlinks" to hit #1.
     2. Email 2 (Value - 3 Days Later): Explain WHY the specific error found (H1 or NAP) kills rankings.
     3. Email 3 (Breakup - 7 Days Later): Gentle reminder.
-    
+
     TONE: Professional, concise, high-value. No fluff.
-    
+
     OUTPUT FORMAT:
     You must output a JSON object with these exact keys:
     {{
@@ -40,25 +186,112 @@ def generate_ai_campaign(row):
         "subject_2": "...", "body_2": "...",
         "subject_3": "...", "body_3": "..."
     }}
+    Subjects: {FIELD_LENGTH_LIMITS['subject'][0]}-{FIELD_LENGTH_LIMITS['subject'][1]} characters.
+    Bodies: {FIELD_LENGTH_LIMITS['body'][0]}-{FIELD_LENGTH_LIMITS['body'][1]} characters.
     """
 
+    CAMPAIGN_STATS['campaigns'] += 1
+    campaign = {}
+
     try:
         # 3. Call Gemini API
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        
-        response = model.generate_content(
-            prompt,
-            generation_config={"response_mime_type": "application/json"}
-        )
-        
-        return json.loads(response.text)
+        campaign = _request_fields(prompt, CAMPAIGN_FIELDS, row, ledger)
+        errors = validate_campaign(campaign)
+        CAMPAIGN_STATS['invalid_fields'] += len(errors)
+
+        if not errors:
+            CAMPAIGN_STATS['valid_first_try'] += 1
+            return {field: campaign[field] for field in CAMPAIGN_FIELDS}
+
+        # 4. Targeted Repair: only regenerate the fields that failed validation
+        for attempt in range(MAX_REPAIR_ATTEMPTS):
+            if ledger is not None and not ledger.can_spend_tokens():
+                print("-> Gemini token budget exhausted. Skipping repair.")
+                break
+
+            print(f"-> Invalid fields {list(errors)}. Regenerating (Attempt {attempt+1}/{MAX_REPAIR_ATTEMPTS})...")
+            CAMPAIGN_STATS['repair_requests'] += 1
+
+            problems = "\n".join(f"    - {field}: {reason}" for field, reason in errors.items())
+            repair_prompt = f"""
+    You are an SEO Sales Copywriter fixing part of a 3-email cold outreach sequence.
+    {prospect_details}
+    These fields were invalid:
+{problems}
+    Rewrite ONLY these fields. Output a JSON object with exactly these keys: {list(errors)}.
+    Subjects: {FIELD_LENGTH_LIMITS['subject'][0]}-{FIELD_LENGTH_LIMITS['subject'][1]} characters.
+    Bodies: {FIELD_LENGTH_LIMITS['body'][0]}-{FIELD_LENGTH_LIMITS['body'][1]} characters.
+    """
+            patch = _request_fields(repair_prompt, list(errors), row, ledger)
+            fixed = [field for field in errors if field not in validate_campaign(patch, [field])]
+            campaign.update({field: patch[field] for field in fixed})
+            errors = validate_campaign(campaign)
+
+            if not errors:
+                CAMPAIGN_STATS['repaired'] += 1
+                return {field: campaign[field] for field in CAMPAIGN_FIELDS}
+
+        print(f"-> Campaign still invalid after repairs: {errors}")
 
     except Exception as e:
+        # API failures are counted apart from outputs that failed validation
         print(f"-> Gemini Error: {e}")
-        return {
-            "subject_1": "Error generating", "body_1": "Error",
-            "subject_2": "Error generating", "body_2": "Error",
-            "subject_3": "Error generating", "body_3": "Error"
-        }
+        CAMPAIGN_STATS['api_errors'] += 1
+        return None
+
+    CAMPAIGN_STATS['failed'] += 1
+    return None
+
+
+def _usable_name(value):
+    return isinstance(value, str) and value.strip() not in ('', 'N/A')
+
+
+def personalize_campaign(campaign, source_row, row):
+    """
+    Adapts a campaign generated for source_row (cluster original) to a near-duplicate row:
+    the original's Company_Name and city name are replaced by the clone's in every field.
+    Returns the personalized campaign, or None when a differing name can't be substituted
+    (e.g. the clone's company name is unknown), so another business's copy is never sent.
+    """
+    replacements = []
+    for column in ('Company_Name', 'City'):
+        source_value, value = source_row.get(column), row.get(column)
+        if source_value == value:
+            continue
+        if not (_usable_name(source_value) and _usable_name(value)):
+            return None
+
+        replacements.append((source_value.strip(), value.strip()))
+        # Copy usually names the city without state/country ("Midland, Texas" -> "Midland")
+        if column == 'City':
+            source_city, city = source_value.split(',')[0].strip(), value.split(',')[0].strip()
+            if source_city and city and source_city != source_value.strip():
+                replacements.append((source_city, city))
+
+    personalized = {}
+    for field, text in campaign.items():
+        for old, new in replacements:
+            text = re.sub(rf'(?<!\w){re.escape(old)}(?!\w)', lambda _: new, text, flags=re.IGNORECASE)
+        personalized[field] = text
+    return personalized
+
+
+def print_validation_summary():
+    """Prints how many campaigns passed validation, needed repairs, or were dropped."""
+    total = CAMPAIGN_STATS['campaigns']
+    if not total:
+        return
 
+    first_try_rate = CAMPAIGN_STATS['valid_first_try'] / total * 100
+    failure_rate = CAMPAIGN_STATS['failed'] / total * 100
+    api_error_rate = CAMPAIGN_STATS['api_errors'] / total * 100
 
+    print("\n--- AI OUTPUT VALIDATION ---")
+    print(f"Campaigns requested: {total}")
+    print(f"Valid on first try: {CAMPAIGN_STATS['valid_first_try']} ({first_try_rate:.1f}%)")
+    print(f"Repaired: {CAMPAIGN_STATS['repaired']} ({CAMPAIGN_STATS['repair_requests']} follow-up requests, "
+          f"{CAMPAIGN_STATS['invalid_fields']} invalid fields on first try)")
+    print(f"Dropped (invalid): {CAMPAIGN_STATS['failed']} ({failure_rate:.1f}%)")
+    print(f"Dropped (API errors): {CAMPAIGN_STATS['api_errors']} ({api_error_rate:.1f}%, "
+          f"{CAMPAIGN_STATS['api_retries']} retried requests)")
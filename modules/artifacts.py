@@ -0,0 +1,36 @@
+import os
+import json
+
+# Intermediate files passed between the pipeline subcommands
+DEFAULT_WORKDIR = "artifacts"
+SERP_ARTIFACT = "serp_results.json"
+AUDIT_ARTIFACT = "audit_results.json"
+
+
+def artifact_path(workdir, name):
+    """Returns the path of an artifact inside the working directory, creating the directory if needed."""
+    os.makedirs(workdir, exist_ok=True)
+    return os.path.join(workdir, name)
+
+
+def save_records(path, records):
+    """
+    Writes a list of row dictionaries to disk as JSON.
+    Kept as plain JSON so stages that don't need pandas never have to import it.
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(records, f, ensure_ascii=False, default=str)
+    print(f"-> Saved {len(records)} rows to {path}")
+
+
+def load_records(path):
+    """Reads a list of row dictionaries written by save_records."""
+    if not os.path.exists(path):
+        print(f"\n[ERROR] Artifact not found: {path}")
+        print("Run the previous pipeline stage first (e.g., 'python agent.py serp 1 3').")
+        return None
+
+    with open(path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    print(f"-> Loaded {len(records)} rows from {path}")
+    return records
@@ -43,3 +43,34 @@ DIRECTORY_DOMAINS = [
 JUNK_EMAIL_EXTENSIONS = ['.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.js', '.css', '.woff', '.ttf']
 JUNK_EMAIL_PREFIXES = ['sentry', 'noreply', 'no-reply', 'hostmaster', 'postmaster', 'webmaster', 'example']
 JUNK_EMAIL_DOMAINS = ['wix.com', 'godaddy.com', 'squarespace.com', 'sentry.io', 'wordpress.com', 'google.com', 'yandex.ru', 'example.com']
+
+# Near-duplicate (franchise/template clone) detection
+SIMHASH_BITS = 64
+SIMHASH_SHINGLE_SIZE = 3
+SIMHASH_MAX_DISTANCE = 3  # Max differing bits for two sites to count as clones
+SIMHASH_MIN_TOKENS = 50  # Thinner pages (JS shells, parked/coming-soon templates) are never fingerprinted
+
+# Entity resolution: public suffixes with two labels (acme.co.uk -> keep 3 labels)
+MULTI_PART_TLDS = [
+    'co.uk', 'org.uk', 'ac.uk', 'com.au', 'net.au', 'co.nz', 'com.mx', 'com.br', 'co.za', 'co.in', 'co.jp'
+]
+# Shared hosting platforms: each subdomain is a different business
+HOSTED_PLATFORM_DOMAINS = [
+    'wixsite.com', 'wordpress.com', 'squarespace.com', 'godaddysites.com', 'weebly.com',
+    'business.site', 'blogspot.com', 'webflow.io', 'netlify.app', 'github.io', 'square.site', 'carrd.co'
+]
+
+# API pricing used for the run cost summary (USD, adjust to your plan)
+SERPAPI_COST_PER_SEARCH = 0.015
+GEMINI_INPUT_COST_PER_MTOK = 0.30
+GEMINI_OUTPUT_COST_PER_MTOK = 2.50
+AI_TOKENS_PER_CAMPAIGN_ESTIMATE = 2000  # Used for budget checks before the first Gemini call
+
+# Audit scheduling: title/snippet phrases typical of listicles and aggregator pages
+LISTICLE_SIGNALS = ['top 10', 'top 5', 'top 20', 'best 10', 'the best', ' reviews', 'directory', 'list of', 'find a', 'compare']
+# Snippet patterns showing the business publishes contact details (phone, email, contact page)
+CONTACT_SIGNAL_PATTERN = r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}|@[a-z0-9-]+\.[a-z]{2,}|contact|call us|call now'
+
+# Contact discovery: paths fetched speculatively while the homepage is parsed (accepted in this order)
+COMMON_CONTACT_PATHS = ['/contact', '/contact-us', '/about-us']
+MAX_SITEMAP_CONTACT_URLS = 3
@@ -0,0 +1,157 @@
+import os
+import re
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urljoin, urlparse
+from .constants import COMMON_CONTACT_PATHS, MAX_SITEMAP_CONTACT_URLS
+from .entities import registrable_domain
+
+CONTACT_CACHE_ARTIFACT = "contact_cache.json"
+
+SITEMAP_CONTACT_PATTERN = re.compile(r'<loc>\s*([^<\s]*(?:contact|about)[^<\s]*)\s*</loc>', re.IGNORECASE)
+
+
+class ContactSpeculation:
+    """
+    Handle for the contact-page fetches started for one site while its homepage is parsed.
+    Pages are kept in candidate order (the order resolve() accepts them in); the sitemap
+    is fetched alongside but its entries only join after every other candidate.
+    """
+
+    def __init__(self, discovery, base_url, candidates, sitemap_url=None):
+        self._discovery = discovery
+        self.base_url = base_url
+        self.pages = []  # [(candidate_url, future)] in acceptance order
+        self.tried = set()
+        self.sitemap = discovery.submit(sitemap_url) if sitemap_url else None
+        for url in candidates:
+            self.submit(url)
+
+    def cancel(self):
+        """Email found or site is a clone: drop the fetches that haven't started yet."""
+        for _, future in self.pages:
+            future.cancel()
+        if self.sitemap is not None:
+            self.sitemap.cancel()
+
+    def submit(self, url):
+        if url in self.tried or url.rstrip('/') == self.base_url.rstrip('/'):
+            return
+        self.tried.add(url)
+        self.pages.append((url, self._discovery.submit(url)))
+
+
+class ContactDiscovery:
+    """
+    Finds the page holding a site's email without the old fetch-then-hop delay.
+    - Known domains go straight to their cached contact URL (cache persists across runs).
+    - Unknown domains get common contact paths and sitemap.xml fetched concurrently
+      with the homepage parse; sitemap entries mentioning contact/about are tried last.
+    Fetches run concurrently, but the winner is picked in a fixed order (cached URL,
+    COMMON_CONTACT_PATHS, the homepage's best link, sitemap entries): a later candidate
+    only wins once every earlier one failed, so replays pick the same page as the recording.
+    The winner is cached for its domain.
+    """
+
+    def __init__(self, fetch, cache_path=None, max_workers=8):
+        self._fetch = fetch
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self.cache_path = cache_path
+        self.cache = {}
+
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                self.cache = json.load(f)
+
+    def known_domains(self):
+        with self._lock:
+            return set(self.cache)
+
+    def submit(self, url):
+        return self._executor.submit(self._fetch, url)
+
+    def speculate(self, base_url):
+        """Starts fetching the likely contact pages of base_url. Returns a ContactSpeculation."""
+        domain = registrable_domain(base_url)
+        with self._lock:
+            cached = self.cache.get(domain)
+
+        if cached:
+            return ContactSpeculation(self, base_url, [cached])
+
+        candidates = [urljoin(base_url, path) for path in COMMON_CONTACT_PATHS]
+        return ContactSpeculation(self, base_url, candidates, sitemap_url=urljoin(base_url, '/sitemap.xml'))
+
+    @staticmethod
+    def _result(future, cancel_event):
+        """Waits for one fetch, polling cancel_event. Returns (response or None, cancelled)."""
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                return None, True
+            done, _ = wait([future], timeout=0.2)
+            if done:
+                return (None if future.cancelled() else future.result()), False
+
+    def _queue_sitemap_entries(self, speculation, cancel_event):
+        response, cancelled = self._result(speculation.sitemap, cancel_event)
+        speculation.sitemap = None
+        if cancelled or response is None or response.status_code != 200:
+            return cancelled
+
+        text = response.content.decode('utf-8', errors='ignore')
+        base_netloc = urlparse(speculation.base_url).netloc.replace('www.', '')
+        for loc in SITEMAP_CONTACT_PATTERN.findall(text)[:MAX_SITEMAP_CONTACT_URLS]:
+            if base_netloc in urlparse(loc).netloc:
+                speculation.submit(loc)
+        return False
+
+    def resolve(self, speculation, extract_emails, fallback_url=None, cancel_event=None):
+        """
+        Checks the speculative fetches (plus fallback_url, the best link scored on the homepage)
+        in candidate order and returns (contact_url, emails) for the first page with a valid
+        email, or (None, []) if none has one or cancel_event was set.
+        fetch results are responses (or None); extract_emails(response) returns the valid emails.
+        """
+        if fallback_url:
+            speculation.submit(fallback_url)
+
+        position = 0
+        while True:
+            if position == len(speculation.pages):
+                if speculation.sitemap is None:
+                    return None, []
+                if self._queue_sitemap_entries(speculation, cancel_event):
+                    speculation.cancel()
+                    return None, []
+                continue
+
+            url, future = speculation.pages[position]
+            position += 1
+
+            response, cancelled = self._result(future, cancel_event)
+            if cancelled:
+                speculation.cancel()
+                return None, []
+            if response is None or response.status_code != 200:
+                continue
+
+            emails = extract_emails(response)
+            if emails:
+                speculation.cancel()
+                with self._lock:
+                    self.cache[registrable_domain(speculation.base_url)] = url
+                return url, emails
+
+    def save(self):
+        if not self.cache_path:
+            return
+        with self._lock:
+            with open(self.cache_path, 'w', encoding='utf-8') as f:
+                json.dump(self.cache, f, indent=2)
+        print(f"-> Contact cache saved ({len(self.cache)} domains) to {self.cache_path}")
+
+    def close(self):
+        """Waits for in-flight fetches so they're recorded before the replay archive closes."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,115 @@
+import os
+import json
+import threading
+from collections import Counter
+from .constants import SERPAPI_COST_PER_SEARCH, GEMINI_INPUT_COST_PER_MTOK, GEMINI_OUTPUT_COST_PER_MTOK, AI_TOKENS_PER_CAMPAIGN_ESTIMATE
+
+COSTS_ARTIFACT = "costs.json"
+
+
+class CostLedger:
+    """
+    Records billable API usage for a run and enforces the optional budgets.
+    - SerpApi: one credit per search request (retries included), per engine/stage/keyword/city.
+    - Gemini: input/output tokens per request, per stage/lead/keyword/city.
+    Saved to the working directory so the serp, audit and report subcommands share one ledger.
+    """
+
+    def __init__(self, max_serp_credits=None, max_ai_tokens=None):
+        self.max_serp_credits = max_serp_credits
+        self.max_ai_tokens = max_ai_tokens
+        self.searches = []
+        self.token_usage = []
+        self._lock = threading.Lock()
+
+    # --- Budgets ---
+
+    @property
+    def serp_credits_used(self):
+        return len(self.searches)
+
+    @property
+    def ai_tokens_used(self):
+        return sum(entry['input_tokens'] + entry['output_tokens'] for entry in self.token_usage)
+
+    def can_search(self):
+        return self.max_serp_credits is None or self.serp_credits_used < self.max_serp_credits
+
+    def expected_campaign_tokens(self):
+        """Average tokens per lead so far (falls back to a fixed estimate before the first call)."""
+        leads = {entry['lead'] for entry in self.token_usage if entry['stage'] == 'ai'}
+        if not leads:
+            return AI_TOKENS_PER_CAMPAIGN_ESTIMATE
+        return self.ai_tokens_used / len(leads)
+
+    def can_spend_tokens(self, estimate=0):
+        return self.max_ai_tokens is None or self.ai_tokens_used + estimate <= self.max_ai_tokens
+
+    # --- Recording ---
+
+    def record_search(self, engine, stage, keyword, city):
+        with self._lock:
+            self.searches.append({'engine': engine, 'stage': stage, 'keyword': keyword, 'city': city})
+
+    def record_tokens(self, stage, lead, keyword, city, input_tokens, output_tokens):
+        with self._lock:
+            self.token_usage.append({
+                'stage': stage,
+                'lead': lead,
+                'keyword': keyword,
+                'city': city,
+                'input_tokens': int(input_tokens or 0),
+                'output_tokens': int(output_tokens or 0),
+            })
+
+    def reset_tokens(self, stage):
+        """Drops the token entries of a stage that is about to run again (a rerun replaces its spend)."""
+        with self._lock:
+            self.token_usage = [entry for entry in self.token_usage if entry['stage'] != stage]
+
+    # --- Persistence ---
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'searches': self.searches, 'token_usage': self.token_usage}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path, max_serp_credits=None, max_ai_tokens=None):
+        """Loads the ledger of an earlier stage of this run (or starts an empty one)."""
+        ledger = cls(max_serp_credits, max_ai_tokens)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            ledger.searches = data.get('searches', [])
+            ledger.token_usage = data.get('token_usage', [])
+        return ledger
+
+    # --- Reporting ---
+
+    def estimated_cost(self):
+        input_tokens = sum(entry['input_tokens'] for entry in self.token_usage)
+        output_tokens = sum(entry['output_tokens'] for entry in self.token_usage)
+        serp_cost = self.serp_credits_used * SERPAPI_COST_PER_SEARCH
+        ai_cost = (input_tokens * GEMINI_INPUT_COST_PER_MTOK + output_tokens * GEMINI_OUTPUT_COST_PER_MTOK) / 1_000_000
+        return serp_cost, ai_cost
+
+    def print_summary(self, actionable_leads=None):
+        serp_cost, ai_cost = self.estimated_cost()
+        input_tokens = sum(entry['input_tokens'] for entry in self.token_usage)
+        output_tokens = sum(entry['output_tokens'] for entry in self.token_usage)
+
+        print("\n--- RUN COST SUMMARY ---")
+        for (engine, stage), count in sorted(Counter((s['engine'], s['stage']) for s in self.searches).items()):
+            print(f"SerpApi searches [{engine} / {stage}]: {count}")
+        print(f"SerpApi credits: {self.serp_credits_used}"
+              + (f" / {self.max_serp_credits} budget" if self.max_serp_credits is not None else "")
+              + f" (~${serp_cost:.2f})")
+        print(f"Gemini tokens: {input_tokens} in / {output_tokens} out"
+              + (f" ({self.ai_tokens_used} / {self.max_ai_tokens} budget)" if self.max_ai_tokens is not None else "")
+              + f" (~${ai_cost:.4f})")
+        print(f"Estimated total: ~${serp_cost + ai_cost:.2f}")
+
+        if actionable_leads:
+            print(f"Cost per actionable lead: ~${(serp_cost + ai_cost) / actionable_leads:.3f} ({actionable_leads} leads)")
+        elif actionable_leads == 0:
+            print("Cost per actionable lead: n/a (no actionable leads)")
@@ -3,9 +3,45 @@ from bs4 import BeautifulSoup
 import re
 from urllib.parse import urlparse, urljoin
 import random
-import time
+import base64
 from requests.exceptions import RequestException
+from requests.structures import CaseInsensitiveDict
 from .constants import USER_AGENTS, JUNK_EMAIL_EXTENSIONS, JUNK_EMAIL_PREFIXES, JUNK_EMAIL_DOMAINS
+from .fingerprint import simhash
+from .replay import through_archive, error_factory, pause
+
+# Cheap check on the raw homepage bytes: pages that look like they carry an email skip the
+# speculative contact fetches (they start later, only if parsing finds no valid email)
+RAW_EMAIL_HINT = re.compile(rb'mailto:|[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+
+def _encode_response(response):
+    return {
+        'status_code': response.status_code,
+        'url': response.url,
+        'headers': dict(response.headers),
+        'encoding': response.encoding,
+        'content': base64.b64encode(response.content or b'').decode('ascii'),
+    }
+
+def _decode_response(data):
+    response = requests.Response()
+    response.status_code = data['status_code']
+    response.url = data['url']
+    response.headers = CaseInsensitiveDict(data['headers'])
+    response.encoding = data['encoding']
+    response._content = base64.b64decode(data['content'])
+    return response
+
+def _http_get(url, headers, timeout):
+    """requests.get() for the crawler (status, headers and body are recorded/replayed when an archive is configured)."""
+    return through_archive(
+        'http',
+        url,
+        lambda: requests.get(url, headers=headers, timeout=timeout),
+        _encode_response,
+        _decode_response,
+        error_factory(RequestException)
+    )
 
 def extract_emails_from_html(soup):
     """
@@ -127,10 +163,31 @@ def find_best_contact_url(soup, base_url):
     
     return None
 
-def run_on_page_audit(url: str, keyword: str, city: str, max_retries: int = 3) -> dict: 
+def fetch_contact_page(url):
+    """Fetcher used by ContactDiscovery for speculative contact-page requests (None on failure)."""
+    headers = {
+        'User-Agent': random.choice(USER_AGENTS),
+        'Accept-Language': 'en-US,en;q=0.9'
+    }
+    try:
+        return _http_get(url, headers, 10)
+    except Exception:
+        return None
+
+def _emails_from_response(response):
+    return extract_emails_from_html(BeautifulSoup(response.content, 'html.parser'))
+
+def run_on_page_audit(url: str, keyword: str, city: str, max_retries: int = 3, fingerprint_index=None, cancel_event=None, contact_discovery=None, url_timer=None) -> dict: 
     """
     Performs SEO checks AND extracts Email/NAP.
     Includes logic to hop to the Contact page if email is missing.
+    If a SimHashIndex is given, near-duplicates of an already-audited site
+    are flagged via 'Duplicate_Of' and skip the Contact page crawl.
+    If cancel_event gets set (lead target reached), the audit stops before its
+    next request and returns Error_Status 'Cancelled'.
+    With a ContactDiscovery, likely contact pages are fetched while the
+    homepage is parsed instead of hopping to them afterwards.
+    A UrlTimer (--profile sampling) gets fetch/parse/email/contact-hop timings.
     """
     # --- AUDIT DATA INITIALIZATION ---
     audit_data = {
@@ -143,7 +200,9 @@ def run_on_page_audit(url: str, keyword: str, city: str, max_retries: int = 3) -
         'Phone_Number': 'N/A',
         'Email_Address': 'N/A',
         'Company_Name': 'N/A' ,
-        'Error_Status': 'Success'
+        'Error_Status': 'Success',
+        'Content_Fingerprint': '',
+        'Duplicate_Of': ''
     }
     
     response = None
@@ -154,13 +213,17 @@ def run_on_page_audit(url: str, keyword: str, city: str, max_retries: int = 3) -
 
     # --- 1. REQUEST LANDING PAGE ---
     for attempt in range(max_retries):
+        if cancel_event is not None and cancel_event.is_set():
+            audit_data['Error_Status'] = 'Cancelled'
+            return audit_data
+
         try:
             if attempt > 0:
                 sleep_time = random.uniform(3, 5) 
                 print(f"   -> Retrying in {sleep_time:.1f}s...")
-                time.sleep(sleep_time)
+                pause(sleep_time)
 
-            response = requests.get(url, headers=headers, timeout=15)
+            response = _http_get(url, headers, 15)
             
             # Check for blocking status codes
             if response.status_code in [403, 406, 429, 503]:
@@ -178,6 +241,14 @@ def run_on_page_audit(url: str, keyword: str, city: str, max_retries: int = 3) -
                 audit_data['H1_Audit_Result'] = f"Error: Request Failed ({e.__class__.__name__})"
                 return audit_data
 
+    # Start fetching likely contact pages (cached URL, common paths, sitemap) right away
+    if url_timer is not None:
+        url_timer.mark('fetch')
+
+    speculation = None
+    if contact_discovery is not None and response is not None and not RAW_EMAIL_HINT.search(response.content or b''):
+        speculation = contact_discovery.speculate(url)
+
     # --- 2. PARSE LANDING PAGE ---
     try:
         if response and response.content:
@@ -259,18 +330,61 @@ def run_on_page_audit(url: str, keyword: str, city: str, max_retries: int = 3) -
                  if footer and re.search(phone_regex, footer.get_text(), re.IGNORECASE):
                     audit_data['NAP_Audit_Result'] = 'Pass: Address/Phone Found (in footer)'
 
+            # --- Near-Duplicate Detection (Franchise/Template Clones) ---
+            fingerprint = simhash(soup.get_text(" ", strip=True), ignore_words=re.findall(r'[a-zA-Z]+', city))
+            if fingerprint is not None:
+                audit_data['Content_Fingerprint'] = f"{fingerprint:016x}"
+                if fingerprint_index is not None:
+                    duplicate_of = fingerprint_index.find_or_add(fingerprint, url)
+                    if duplicate_of:
+                        audit_data['Duplicate_Of'] = duplicate_of
+                        print(f"   = Near-duplicate of {duplicate_of}")
+                        # Clones skip the contact crawl: stop their speculative fetches right away
+                        if speculation is not None:
+                            speculation.cancel()
+
+            if url_timer is not None:
+                url_timer.mark('parse')
+
             # 2. Email Extraction (Landing Page)
             emails = extract_emails_from_html(soup)
+
+            if url_timer is not None:
+                url_timer.mark('email_extraction')
             
-            # 3. Contact Page Crawl (If Email Missing)
-            if not emails:
+            # 3. Contact Page Crawl (If Email Missing, clones reuse their original's analysis)
+            if not emails and not audit_data['Duplicate_Of']:
                 contact_url = find_best_contact_url(soup, url)
                 
-                if contact_url:
+                if cancel_event is not None and cancel_event.is_set():
+                    audit_data['Error_Status'] = 'Cancelled'
+                    return audit_data
+
+                if contact_discovery is not None:
+                    # Homepage looked like it had an email but none was valid: start the fetches now
+                    if speculation is None:
+                        speculation = contact_discovery.speculate(url)
+
+                    fallback_url = contact_url if contact_url and contact_url.rstrip('/') != url.rstrip('/') else None
+                    found_url, new_emails = contact_discovery.resolve(
+                        speculation,
+                        _emails_from_response,
+                        fallback_url=fallback_url,
+                        cancel_event=cancel_event
+                    )
+                    if new_emails:
+                        print(f"-> Found {len(new_emails)} email(s) on Contact page: {found_url}")
+                        emails = new_emails
+                    elif cancel_event is not None and cancel_event.is_set():
+                        # Contact search cut short: a partial audit must not look like "No Email Found"
+                        audit_data['Error_Status'] = 'Cancelled'
+                        return audit_data
+
+                elif contact_url:
                     if contact_url.rstrip('/') != url.rstrip('/'):
                         print(f"-> Crawling Contact Page: {contact_url}")
                         try:
-                            resp_contact = requests.get(contact_url, headers=headers, timeout=10)
+                            resp_contact = _http_get(contact_url, headers, 10)
                             if resp_contact.status_code == 200:
                                 soup_contact = BeautifulSoup(resp_contact.content, 'html.parser')
                                 new_emails = extract_emails_from_html(soup_contact)
@@ -280,6 +394,9 @@ def run_on_page_audit(url: str, keyword: str, city: str, max_retries: int = 3) -
                         except Exception:
                             pass
 
+            if url_timer is not None:
+                url_timer.mark('contact_hop')
+
             if emails:
                 audit_data['Email_Address'] = emails[0]
                 print(f"   + Email Secured: {emails[0]}")
@@ -288,5 +405,10 @@ def run_on_page_audit(url: str, keyword: str, city: str, max_retries: int = 3) -
             
     except Exception as e:
         audit_data['Error_Status'] = f"Error: Parsing Failure ({e.__class__.__name__})"
+
+    finally:
+        # Email already found (or audit aborted): drop contact fetches that haven't started
+        if speculation is not None:
+            speculation.cancel()
     
     return audit_data
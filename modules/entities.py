@@ -0,0 +1,116 @@
+import re
+from urllib.parse import urlparse
+from .constants import MULTI_PART_TLDS, HOSTED_PLATFORM_DOMAINS
+
+def normalize_email(value):
+    """Lowercased email, or None for missing/placeholder values."""
+    if not isinstance(value, str):
+        return None
+    value = value.strip().lower()
+    if not value or value == 'n/a' or '@' not in value:
+        return None
+    return value
+
+def normalize_phone(value):
+    """Last 10 digits of a phone number (drops +1/formatting), or None if too short."""
+    if not isinstance(value, str):
+        return None
+    digits = re.sub(r'\D', '', value)
+    if len(digits) < 10:
+        return None
+    return digits[-10:]
+
+def registrable_domain(url):
+    """
+    Collapses subdomains, www, scheme and ports to the registrable domain
+    (e.g. https://midland.acme-diesel.com/contact -> acme-diesel.com).
+    Sites on shared hosting platforms keep their own subdomain.
+    """
+    if not isinstance(url, str) or not url:
+        return None
+    if '://' not in url:
+        url = f"http://{url}"
+
+    host = (urlparse(url).hostname or '').lower().rstrip('.')
+    labels = [label for label in host.split('.') if label]
+    if len(labels) < 2 or all(label.isdigit() for label in labels): # Bare hosts and IPs
+        return host or None
+
+    suffix = '.'.join(labels[-2:])
+    keep = 3 if suffix in MULTI_PART_TLDS or suffix in HOSTED_PLATFORM_DOMAINS else 2
+    return '.'.join(labels[-keep:])
+
+def _find(parents, i):
+    while parents[i] != i:
+        parents[i] = parents[parents[i]]
+        i = parents[i]
+    return i
+
+def resolve_entities(df):
+    """
+    Merges rows that belong to the same business (same email, phone or registrable domain)
+    into one prospect entity. Adds:
+    - Entity_ID: shared by all rows of a business
+    - Is_Entity_Primary: True for the row that gets the campaign, picked among successfully
+      audited rows with their own email first, then audited rows, then the rest (best Rank breaks ties)
+    The primary takes the entity's best Rank, and if it has no email/phone it inherits
+    the best-ranked one from its entity.
+    """
+    if df.empty:
+        return df
+
+    df = df.reset_index(drop=True)
+    rows = len(df)
+    parents = list(range(rows))
+
+    keys = {
+        'email': df['Email_Address'].map(normalize_email) if 'Email_Address' in df.columns else [None] * rows,
+        'phone': df['Phone_Number'].map(normalize_phone) if 'Phone_Number' in df.columns else [None] * rows,
+        'domain': df['URL'].map(registrable_domain),
+    }
+
+    # One hash index per key type: first row seen owns the key, later rows are unioned into it
+    for values in keys.values():
+        index = {}
+        for i, key in enumerate(values):
+            if not isinstance(key, str): # None/NaN = no key for this row
+                continue
+            if key in index:
+                root_a, root_b = _find(parents, index[key]), _find(parents, i)
+                if root_a != root_b:
+                    parents[root_b] = root_a
+            else:
+                index[key] = i
+
+    roots = [_find(parents, i) for i in range(rows)]
+    df['Entity_ID'] = roots
+    df['Entity_ID'] = df.groupby('Entity_ID', sort=False).ngroup() + 1
+
+    # Skipped/blocked/failed audits never represent the business while a sibling was audited
+    rank = df['Rank'].astype(float).fillna(float('inf'))
+    audited = df['Error_Status'].eq('Success') if 'Error_Status' in df.columns else True
+    has_email = keys['email'].notna() if 'Email_Address' in df.columns else False
+    tier = 2 - audited * 1 - (has_email & audited) * 1  # 0: audited with own email, 1: audited, 2: rest
+
+    order = df.assign(_tier=tier, _rank=rank).sort_values(by=['_tier', '_rank'], kind='stable').index
+    primary_index = df.loc[order].drop_duplicates(subset=['Entity_ID'], keep='first').index
+
+    df['Is_Entity_Primary'] = False
+    df.loc[primary_index, 'Is_Entity_Primary'] = True
+
+    merged_entities = 0
+    for entity_id, members in df.loc[order].groupby('Entity_ID', sort=False):
+        if len(members) < 2:
+            continue
+        merged_entities += 1
+        primary = members.index[0]
+        df.loc[primary, 'Rank'] = members['Rank'].min()
+        for column, normalizer in (('Email_Address', normalize_email), ('Phone_Number', normalize_phone)):
+            if column not in df.columns or normalizer(df.loc[primary, column]):
+                continue
+            usable = members[column].map(normalizer).notna()
+            if usable.any():
+                df.loc[primary, column] = members.loc[usable, column].iloc[0]
+
+    print(f"-> Entity resolution: {rows} rows -> {df['Entity_ID'].nunique()} businesses ({merged_entities} merged)")
+    return df
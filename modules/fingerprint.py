@@ -0,0 +1,98 @@
+import re
+import hashlib
+import threading
+from .constants import SIMHASH_BITS, SIMHASH_SHINGLE_SIZE, SIMHASH_MAX_DISTANCE, SIMHASH_MIN_TOKENS
+
+
+def _hash_shingle(shingle):
+    """Stable 64-bit hash (Python's hash() is salted per process, so it can't be stored)."""
+    return int.from_bytes(hashlib.md5(shingle.encode('utf-8')).digest()[:8], 'big')
+
+
+def simhash(text, ignore_words=(), shingle_size=SIMHASH_SHINGLE_SIZE, min_tokens=SIMHASH_MIN_TOKENS):
+    """
+    Computes a 64-bit SimHash over word shingles of the page text.
+    Digits and ignore_words (e.g. the target city) are dropped so phone numbers
+    and location names don't split template clones.
+    Returns None when the page has fewer than min_tokens words: thin pages
+    ("You need to enable JavaScript...", parked domains) hash alike for unrelated sites.
+    """
+    ignore = {w.lower() for w in ignore_words}
+    tokens = [t for t in re.findall(r'[a-z]+', text.lower()) if t not in ignore]
+    if not tokens or len(tokens) < max(min_tokens, shingle_size):
+        return None
+
+    shingles = [' '.join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)]
+
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles:
+        h = _hash_shingle(shingle)
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+class SimHashIndex:
+    """
+    Near-neighbour index over SimHash fingerprints.
+    The fingerprint is split into (max_distance + 1) bands: two fingerprints within
+    max_distance bits must share at least one band exactly (pigeonhole), so a lookup
+    only compares against the few fingerprints sharing a band instead of all of them.
+    """
+
+    def __init__(self, max_distance=SIMHASH_MAX_DISTANCE):
+        # Every band needs at least one bit: 0..SIMHASH_BITS-1 differing bits
+        if not 0 <= max_distance < SIMHASH_BITS:
+            raise ValueError(f"max_distance must be between 0 and {SIMHASH_BITS - 1}, got {max_distance}.")
+        self.max_distance = max_distance
+        band_count = max_distance + 1
+        width = SIMHASH_BITS // band_count
+        self._bands = [
+            (i * width, SIMHASH_BITS if i == band_count - 1 else (i + 1) * width)
+            for i in range(band_count)
+        ]
+        self._tables = [{} for _ in self._bands]
+        self._lock = threading.Lock()
+
+    def _band_keys(self, fingerprint):
+        for start, end in self._bands:
+            yield (fingerprint >> start) & ((1 << (end - start)) - 1)
+
+    def _find(self, fingerprint):
+        best_key, best_distance = None, self.max_distance + 1
+        for table, band_key in zip(self._tables, self._band_keys(fingerprint)):
+            for other, key in table.get(band_key, ()):
+                distance = hamming_distance(fingerprint, other)
+                if distance < best_distance:
+                    best_key, best_distance = key, distance
+        return best_key
+
+    def _add(self, fingerprint, key):
+        for table, band_key in zip(self._tables, self._band_keys(fingerprint)):
+            table.setdefault(band_key, []).append((fingerprint, key))
+
+    def find(self, fingerprint):
+        """Returns the key of the closest indexed fingerprint within max_distance, or None."""
+        with self._lock:
+            return self._find(fingerprint)
+
+    def add(self, fingerprint, key):
+        with self._lock:
+            self._add(fingerprint, key)
+
+    def find_or_add(self, fingerprint, key):
+        """Returns the key of an existing near-duplicate, or indexes this fingerprint and returns None."""
+        with self._lock:
+            match = self._find(fingerprint)
+            if match is None:
+                self._add(fingerprint, key)
+            return match
@@ -0,0 +1,34 @@
+import time
+from contextlib import nullcontext
+
+# Imported on every run: keep it stdlib-light (cProfile/tracemalloc live in stage_profiler.py)
+
+PROFILE_DIR = "profile"
+URL_PHASES = ['fetch', 'parse', 'email_extraction', 'contact_hop']
+
+
+def profile_stage(profiler, name):
+    """Context manager for one pipeline stage; a no-op nullcontext when profiling is off."""
+    if profiler is None:
+        return nullcontext()
+    return profiler.stage(name)
+
+
+class UrlTimer:
+    """Per-URL phase timings inside run_on_page_audit (fetch, parse, email extraction, contact hop)."""
+
+    def __init__(self, profiler, url):
+        self._profiler = profiler
+        self.url = url
+        self.timings = {}
+        self._start = self._last = time.perf_counter()
+
+    def mark(self, phase):
+        """Charges the time since the previous mark to `phase`."""
+        now = time.perf_counter()
+        self.timings[phase] = self.timings.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def finish(self):
+        self.timings['total'] = time.perf_counter() - self._start
+        self._profiler.record_url(self)
@@ -0,0 +1,172 @@
+import re
+import csv
+import json
+import zlib
+
+# Queries handed to the SERP stage per breadth-first batch
+QUERY_BATCH_SIZE = 50
+
+
+def parse_shard(value):
+    """Parses '--shard i/n' (1-based) into (i, n)."""
+    match = re.fullmatch(r'\s*(\d+)\s*/\s*(\d+)\s*', value or '')
+    if not match:
+        raise ValueError(f"Invalid shard '{value}'. Expected the form i/n (e.g., 2/4).")
+    index, count = int(match.group(1)), int(match.group(2))
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{value}'. Expected 1 <= i <= n.")
+    return index, count
+
+
+def normalize_query(keyword, city):
+    """
+    Cleans one keyword/city pair. Whitespace is collapsed, and a keyword that already
+    ends with the city name ("diesel repair midland" + "Midland, Texas") drops it so it
+    overlaps with the plain keyword. Returns (keyword, city, dedupe_key) or None if empty.
+    """
+    keyword = ' '.join(str(keyword or '').split())
+    city = ' '.join(str(city or '').split())
+    if not keyword or not city:
+        return None
+
+    city_name = city.split(',')[0].strip()
+    if city_name and keyword.lower().endswith(' ' + city_name.lower()):
+        keyword = keyword[:-len(city_name)].strip()
+
+    return keyword, city, (keyword.lower(), city.lower())
+
+
+def _iter_lines(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+
+
+def _query_from_record(record):
+    return record.get('keyword') or record.get('Keyword'), record.get('city') or record.get('City')
+
+
+def _iter_jsonl(path):
+    """Streams JSONL records; malformed or non-object lines are reported with their line number and skipped."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                print(f"[WARNING] {path}:{line_number}: invalid JSON ({e}). Skipping line.")
+                continue
+            if not isinstance(record, dict):
+                print(f"[WARNING] {path}:{line_number}: expected an object with keyword/city. Skipping line.")
+                continue
+            yield _query_from_record(record)
+
+
+def _iter_json_array(path):
+    """Reads a .json file holding a top-level array of {keyword, city} objects."""
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            records = json.load(f)
+        except ValueError as e:
+            raise ValueError(f"{path}: invalid JSON ({e}). Use .jsonl/.ndjson for one object per line.")
+    if not isinstance(records, list):
+        raise ValueError(f"{path}: expected a JSON array of {{keyword, city}} objects.")
+
+    for position, record in enumerate(records, 1):
+        if not isinstance(record, dict):
+            print(f"[WARNING] {path}: item {position} is not an object with keyword/city. Skipping it.")
+            continue
+        yield _query_from_record(record)
+
+
+def _iter_csv(path):
+    """Streams a keyword,city CSV; rows missing either value are reported with their line number and skipped."""
+    # utf-8-sig: Excel "CSV UTF-8" exports start with a BOM that would hide the first header
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.DictReader(f)
+        columns = {name.strip().lower() for name in reader.fieldnames or [] if name}
+        if not {'keyword', 'city'} <= columns:
+            print(f"[WARNING] {path}: header has no keyword/city columns (found: {sorted(columns)}). No queries read.")
+            return
+
+        for record in reader:
+            record = {k.strip().lower(): v for k, v in record.items() if k}
+            keyword, city = (record.get('keyword') or '').strip(), (record.get('city') or '').strip()
+            if not keyword or not city:
+                print(f"[WARNING] {path}:{reader.line_num}: missing keyword or city. Skipping row.")
+                continue
+            yield keyword, city
+
+
+def _iter_query_file(path):
+    """Streams (keyword, city) pairs from a CSV (keyword,city columns), JSONL/NDJSON or JSON array file."""
+    if path.endswith(('.jsonl', '.ndjson')):
+        yield from _iter_jsonl(path)
+    elif path.endswith('.json'):
+        yield from _iter_json_array(path)
+    else:
+        yield from _iter_csv(path)
+
+
+def _iter_cross_product(keywords_path, cities_path):
+    """Keywords are held in memory (the short list), cities are streamed from disk."""
+    keywords = list(dict.fromkeys(_iter_lines(keywords_path)))
+    for city in _iter_lines(cities_path):
+        for keyword in keywords:
+            yield keyword, city
+
+
+def _iter_config():
+    from serp_config import CITIES, KEYWORDS
+    for city in CITIES:
+        for keyword in KEYWORDS:
+            yield keyword, city
+
+
+def iter_queries(query_file=None, keywords_file=None, cities_file=None, shard=None):
+    """
+    Lazily yields unique (keyword, city) queries from, in order of preference:
+    a CSV/JSONL/JSON query file, separate keyword and city files (cross product), or serp_config.py.
+    Duplicates/overlaps are dropped before any API call, and with shard=(i, n) only the
+    queries whose stable hash falls in shard i are yielded, so machines can split a grid.
+    """
+    if query_file:
+        source = _iter_query_file(query_file)
+    elif keywords_file and cities_file:
+        source = _iter_cross_product(keywords_file, cities_file)
+    else:
+        source = _iter_config()
+
+    seen = set()
+    for keyword, city in source:
+        normalized = normalize_query(keyword, city)
+        if normalized is None:
+            continue
+
+        keyword, city, key = normalized
+        if key in seen:
+            continue
+        seen.add(key)
+
+        if shard is not None:
+            index, count = shard
+            if zlib.crc32('|'.join(key).encode('utf-8')) % count != index - 1:
+                continue
+
+        yield keyword, city
+
+
+def iter_batches(queries, size=QUERY_BATCH_SIZE):
+    """Groups a query stream into lists of `size` without materializing the whole grid."""
+    batch = []
+    for query in queries:
+        batch.append(query)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
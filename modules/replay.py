@@ -0,0 +1,163 @@
+import os
+import json
+import gzip
+import time
+import hashlib
+import threading
+
+ARCHIVE_DATA = "archive.bin"
+ARCHIVE_INDEX = "index.jsonl"
+
+# Module-level archive set by configure(); None means live traffic only
+_ARCHIVE = None
+
+
+class ReplayMiss(LookupError):
+    """Raised in replay mode when the archive has no response for a request."""
+
+
+class Archive:
+    """
+    Compact record/replay archive for every external response of a run.
+    - archive.bin: gzip-compressed JSON records appended back to back
+    - index.jsonl: one [request_key_hash, offset, length] line per record, in call order
+    Both files are appended and flushed on every record, so the archive of a killed
+    run stays replayable up to its last response (a torn last index line is ignored).
+    A request made several times (retries, re-crawls) replays its responses in the
+    order they were recorded, repeating the last one if the replay asks for more.
+    """
+
+    def __init__(self, path, mode):
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._replay_positions = {}
+
+        self._index_path = os.path.join(path, ARCHIVE_INDEX)
+        self._data_path = os.path.join(path, ARCHIVE_DATA)
+        self.index = {}
+
+        if mode == 'record':
+            # Appending to an old archive would make replays serve the previous run's responses first
+            if any(os.path.exists(p) for p in (self._index_path, self._data_path)):
+                raise FileExistsError(f"{path} already holds an archive. Record into a new or empty directory.")
+            os.makedirs(path, exist_ok=True)
+            self._data = open(self._data_path, 'wb')
+            self._index = open(self._index_path, 'w', encoding='utf-8')
+            return
+
+        if not os.path.exists(self._index_path):
+            raise FileNotFoundError(f"No replay archive found in {path}")
+        with open(self._index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry_key, offset, length = json.loads(line)
+                except ValueError:
+                    break
+                self.index.setdefault(entry_key, []).append([offset, length])
+        self._data = open(self._data_path, 'rb')
+
+    @staticmethod
+    def _hash(kind, key):
+        return f"{kind}:{hashlib.sha1(key.encode('utf-8')).hexdigest()}"
+
+    def record(self, kind, key, payload):
+        blob = gzip.compress(json.dumps({'key': key, 'payload': payload}, ensure_ascii=False).encode('utf-8'))
+        entry_key = self._hash(kind, key)
+        with self._lock:
+            offset = self._data.tell()
+            self._data.write(blob)
+            self._data.flush()
+            # Index line goes out after its data, so every indexed record is complete on disk
+            self._index.write(json.dumps([entry_key, offset, len(blob)]) + '\n')
+            self._index.flush()
+            self.index.setdefault(entry_key, []).append([offset, len(blob)])
+
+    def lookup(self, kind, key):
+        entry_key = self._hash(kind, key)
+        with self._lock:
+            entries = self.index.get(entry_key)
+            if not entries:
+                raise ReplayMiss(f"No recorded {kind} response for: {key[:120]}")
+
+            position = self._replay_positions.get(entry_key, 0)
+            self._replay_positions[entry_key] = position + 1
+            offset, length = entries[min(position, len(entries) - 1)]
+
+            self._data.seek(offset)
+            blob = self._data.read(length)
+        return json.loads(gzip.decompress(blob))['payload']
+
+    def close(self):
+        with self._lock:
+            if self.mode == 'record':
+                self._index.close()
+                print(f"-> Recorded {sum(len(v) for v in self.index.values())} responses to {self.path}")
+            self._data.close()
+
+
+def configure(record_dir=None, replay_dir=None):
+    """Enables record or replay mode for the whole process."""
+    global _ARCHIVE
+    if record_dir and replay_dir:
+        raise ValueError("--record and --replay can't be used together.")
+    if record_dir:
+        _ARCHIVE = Archive(record_dir, 'record')
+        print(f"-> Recording all external responses to {record_dir}")
+    elif replay_dir:
+        _ARCHIVE = Archive(replay_dir, 'replay')
+        print(f"-> Replaying external responses from {replay_dir} (offline)")
+
+
+def close():
+    global _ARCHIVE
+    if _ARCHIVE is not None:
+        _ARCHIVE.close()
+        _ARCHIVE = None
+
+
+def is_replaying():
+    return _ARCHIVE is not None and _ARCHIVE.mode == 'replay'
+
+
+def pause(seconds):
+    """time.sleep() for politeness/rate-limit delays; skipped when replaying so replays run at full speed."""
+    if not is_replaying():
+        time.sleep(seconds)
+
+
+def through_archive(kind, key, fetch, encode, decode, make_error):
+    """
+    Routes one external call through the archive.
+    - Live: returns fetch().
+    - Record: calls fetch(), stores encode(result) (or the exception raised) under key.
+    - Replay: never touches the network; rebuilds the result with decode(payload)
+      or re-raises the recorded failure via make_error(class_name, message).
+    """
+    if _ARCHIVE is None:
+        return fetch()
+
+    if _ARCHIVE.mode == 'replay':
+        try:
+            payload = _ARCHIVE.lookup(kind, key)
+        except ReplayMiss as e:
+            raise make_error(ReplayMiss.__name__, str(e))
+        if 'error' in payload:
+            raise make_error(payload['error']['type'], payload['error']['message'])
+        return decode(payload['result'])
+
+    try:
+        result = fetch()
+        encoded = encode(result)
+    except Exception as e:
+        _ARCHIVE.record(kind, key, {'error': {'type': e.__class__.__name__, 'message': str(e)}})
+        raise
+    _ARCHIVE.record(kind, key, {'result': encoded})
+    return result
+
+
+def error_factory(base=Exception):
+    """Builds replayed exceptions that keep the recorded class name (so Error_Status etc. match the live run)."""
+    def _factory(name, message):
+        return type(name, (base,), {})(message)
+    return _factory
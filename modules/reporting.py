@@ -1,35 +1,46 @@
 import pandas as pd
 import time
-from .ai_engine import generate_ai_campaign
-from .utils import is_actionable
+from .ai_engine import generate_ai_campaign, personalize_campaign, print_validation_summary
+from .utils import score_leads
+from .entities import resolve_entities
+from .replay import pause
+from .profiling import profile_stage
 
-def create_final_report(df):
-    if df.empty:
-        print("Report not generated: No unique prospects found.")
-        return
-
-    # --- 1. PRE-CALCULATE ACTIONABILITY (Rule-Based) ---
-    print("-> Calculating initial actionability (Rule-based)...")
-    
-    df['Final_Pitch'] = '' 
-    df['Actionable_Target'] = df.apply(is_actionable, axis=1)
-
-    # --- 2. FILTER FOR AI GENERATION ---
-    ai_candidates = df[
-        (df['Actionable_Target'] == 'YES') & 
-        (df['Email_Address'] != 'N/A') & 
-        (df['Email_Address'].notna())
-    ].copy()
-    
-    print(f"-> Identified {len(ai_candidates)} leads for Campaign generation...")
-
-    # --- 3. RUN GEMINI AI LOOP ---
+def _generate_campaigns(ai_candidates, ledger=None, target_leads=None):
+    """
+    Runs the Gemini loop over the candidates (priority order) and returns the rows to merge back.
+    Near-duplicates reuse their cluster's campaign, rewritten with their own company and city.
+    """
     email_data = []
+    cluster_campaigns = {}  # Cluster_Key -> (campaign, row it was generated for)
 
     for index, row in ai_candidates.iterrows():
-        print(f"-> Generating Campaign for: {row['Company_Name']}...")
-        
-        campaign = generate_ai_campaign(row)
+        if target_leads and len(email_data) >= target_leads:
+            print(f"-> Target of {target_leads} campaigns reached. Stopping campaign generation.")
+            break
+
+        if row['Cluster_Key'] in cluster_campaigns:
+            source_campaign, source_row = cluster_campaigns[row['Cluster_Key']]
+            campaign = personalize_campaign(source_campaign, source_row, row)
+            if campaign is None:
+                print(f"-> Skipping near-duplicate {row['URL']}: campaign of {row['Cluster_Key']} can't be personalized.")
+                continue
+            print(f"-> Reusing Campaign of {row['Cluster_Key']} for near-duplicate: {row['URL']}")
+        else:
+            if ledger is not None and not ledger.can_spend_tokens(ledger.expected_campaign_tokens()):
+                print(f"-> Gemini token budget reached ({ledger.ai_tokens_used}/{ledger.max_ai_tokens}). Stopping campaign generation.")
+                break
+
+            print(f"-> Generating Campaign for: {row['Company_Name']}...")
+            campaign = generate_ai_campaign(row, ledger)
+            # A failed campaign isn't cached: the next clone of the cluster gets its own attempt
+            if campaign is not None:
+                cluster_campaigns[row['Cluster_Key']] = (campaign, row)
+            pause(7)
+
+        # Invalid campaigns are left blank so they never reach the Instantly CSV
+        if campaign is None:
+            continue
         
         email_data.append({
             'URL': row['URL'], # Key to merge back
@@ -40,9 +51,14 @@ def create_final_report(df):
             'Subject_3': campaign.get('subject_3', ''),
             'Body_3': campaign.get('body_3', '')
         })
-        
-        time.sleep(7) 
 
+    print_validation_summary()
+
+    return email_data
+
+
+def _export_reports(df, email_data):
+    """Merges the campaigns back and writes the Instantly CSV and the detailed XLSX. Returns the CSV rows."""
     # --- 4. MERGE AI DATA BACK ---
     if email_data:
         ai_df = pd.DataFrame(email_data)
@@ -85,6 +101,9 @@ def create_final_report(df):
 
     detailed_columns = [
         'Actionable_Target',
+        'Lead_Priority_Score',
+        'Entity_ID',
+        'Is_Entity_Primary',
         'Rank',
         'Company_Name',
         'Email_Address',
@@ -106,7 +125,10 @@ def create_final_report(df):
         'Schema_Issue',
         'GBP_Rating',
         'GBP_Review_Count',
+        'GBP_Status',
         'Error_Status',
+        'Audit_Priority',
+        'Duplicate_Of',
         'Snippet',
         'Target_Query'
     ]
@@ -124,4 +146,57 @@ def create_final_report(df):
     print(f"\n[SUCCESS] Final report created!")
     print(f"Human Readable File: {xlsx_filename}")
     print(f"Total Actionable Leads (Ready for Outreach): {len(df_instantly)}")
+
+    return df_instantly
+
+
+def create_final_report(df, ledger=None, target_leads=None, profiler=None):
+    """
+    Scores the audited prospects, generates one Gemini campaign per business
+    (highest Lead_Priority_Score first) and exports the CSV/XLSX files.
+    Generation stops once the CostLedger token budget is spent or
+    `target_leads` campaigns are ready.
+    """
+    if df.empty:
+        print("Report not generated: No unique prospects found.")
+        if ledger is not None:
+            ledger.print_summary(actionable_leads=0)
+        return
+
+    # --- 1. PRE-CALCULATE ACTIONABILITY (Rule-Based, vectorized) ---
+    print("-> Calculating initial actionability (Rule-based)...")
+
+    with profile_stage(profiler, 'scoring'):
+        df['Final_Pitch'] = '' 
+        df = resolve_entities(df)
+        df = score_leads(df)
+
+        # --- 2. FILTER FOR AI GENERATION ---
+        ai_candidates = df[
+            (df['Actionable_Target'] == 'YES') & 
+            (df['Email_Address'] != 'N/A') & 
+            (df['Email_Address'].notna()) &
+            (df['Is_Entity_Primary']) # One campaign per business
+        ].sort_values(by='Lead_Priority_Score', ascending=False).copy()
+    
+        # Near-duplicate sites (franchise/template clones) share one campaign per cluster
+        if 'Duplicate_Of' in ai_candidates.columns:
+            duplicate_of = ai_candidates['Duplicate_Of'].fillna('')
+            ai_candidates['Cluster_Key'] = duplicate_of.where(duplicate_of != '', ai_candidates['URL'])
+        else:
+            ai_candidates['Cluster_Key'] = ai_candidates['URL']
+
+        cluster_count = ai_candidates['Cluster_Key'].nunique()
+        print(f"-> Identified {len(ai_candidates)} leads for Campaign generation ({cluster_count} unique sites)...")
+
+    # --- 3. RUN GEMINI AI LOOP ---
+    with profile_stage(profiler, 'ai'):
+        email_data = _generate_campaigns(ai_candidates, ledger, target_leads)
+
+    # --- 4-6. MERGE & EXPORT ---
+    with profile_stage(profiler, 'export'):
+        df_instantly = _export_reports(df, email_data)
+
+    if ledger is not None:
+        ledger.print_summary(actionable_leads=len(df_instantly))
     print("The script is complete. Run finished.")
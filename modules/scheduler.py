@@ -0,0 +1,120 @@
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import pandas as pd
+from .entities import registrable_domain, normalize_email
+from .constants import LISTICLE_SIGNALS, CONTACT_SIGNAL_PATTERN
+
+# Weights of the expected-yield score (sum = 100)
+RANK_WEIGHT = 50
+NON_DIRECTORY_WEIGHT = 30
+CONTACT_WEIGHT = 20
+
+
+def _text(df, column):
+    if column not in df.columns:
+        return pd.Series('', index=df.index)
+    return df[column].fillna('').astype(str).str.lower()
+
+
+def prioritize_prospects(df, known_contact_domains=()):
+    """
+    Orders prospects by expected yield (likelihood of becoming an actionable lead) so the
+    audit reaches its target early. Adds Audit_Priority (0-100) built from:
+    - best Rank (page 1 results first)
+    - non-directory score: homepages beat deep pages, listicle titles ("Top 10", "Best ...") lose points
+    - contact signals: phone/email/"contact" in the snippet of any result on the same domain,
+      or a contact page already cached for the domain (known_contact_domains)
+    """
+    if df.empty:
+        return df
+
+    rank = pd.to_numeric(df['Rank'], errors='coerce').fillna(100).clip(1, 100)
+    rank_score = (100 - rank) / 99
+
+    title_snippet = _text(df, 'Title') + ' ' + _text(df, 'Snippet')
+    listicle = title_snippet.str.contains('|'.join(map(re.escape, LISTICLE_SIGNALS)), regex=True)
+    path = (
+        df['URL'].fillna('').astype(str)
+        .str.replace(r'^https?://[^/]+', '', regex=True)
+        .str.split(r'[?#]', regex=True).str[0]
+        .str.strip('/')
+    )
+    path_depth = (path != '').astype(int) + path.str.count('/')
+    non_directory_score = (1 - listicle.astype(float) * 0.6) * (1 / (1 + path_depth.clip(0, 4) * 0.25))
+
+    domain = df['URL'].map(registrable_domain)
+    has_contact = _text(df, 'Snippet').str.contains(CONTACT_SIGNAL_PATTERN, regex=True)
+    has_contact |= domain.isin(set(known_contact_domains))
+    domain_contact = has_contact.groupby(domain.fillna('')).transform('max').astype(float)
+
+    df['Audit_Priority'] = (
+        rank_score * RANK_WEIGHT
+        + non_directory_score * NON_DIRECTORY_WEIGHT
+        + domain_contact * CONTACT_WEIGHT
+    ).round(1)
+
+    return df.sort_values(by=['Audit_Priority', 'Rank'], ascending=[False, True], kind='stable')
+
+
+def run_scheduled_audits(df, audit_fn, target_leads=None, workers=1):
+    """
+    Audits rows in DataFrame order (see prioritize_prospects) with up to `workers` in flight.
+    Yields (index, audit_results) as audits finish. Once `target_leads` distinct emails were found,
+    the cancel event is set so in-flight audits stop early, and no further rows are started.
+    audit_fn(row, cancel_event) must return the audit dictionary.
+    With a single worker audits run inline on the calling thread (visible to --profile).
+    """
+    workers = max(1, workers)
+    cancel_event = threading.Event()
+    found_emails = set()
+
+    def _accept(audit_results):
+        # Audits interrupted by the target being reached are discarded, not half-merged
+        if cancel_event.is_set() and audit_results.get('Error_Status') == 'Cancelled':
+            return False
+
+        email = normalize_email(audit_results.get('Email_Address'))
+        if email:
+            found_emails.add(email)
+
+        if target_leads and len(found_emails) >= target_leads and not cancel_event.is_set():
+            print(f"\n-> Target of {target_leads} leads with email reached. Cancelling remaining audits.")
+            cancel_event.set()
+        return True
+
+    if workers == 1:
+        for index, row in df.iterrows():
+            if cancel_event.is_set():
+                break
+            audit_results = audit_fn(row, cancel_event)
+            if _accept(audit_results):
+                yield index, audit_results
+        return
+
+    pending_rows = iter(df.iterrows())
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = {}
+
+        def _submit_next():
+            for index, row in pending_rows:
+                in_flight[executor.submit(audit_fn, row, cancel_event)] = index
+                return True
+            return False
+
+        for _ in range(workers):
+            if not _submit_next():
+                break
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = in_flight.pop(future)
+                audit_results = future.result()
+                if _accept(audit_results):
+                    yield index, audit_results
+
+            if not cancel_event.is_set():
+                while len(in_flight) < workers and _submit_next():
+                    pass
@@ -1,10 +1,25 @@
 from serpapi import GoogleSearch
-import time
+import json
 import random
+from .replay import through_archive, error_factory, pause
 
-def serpapi_extractor(keyword, city, start_page, end_page, api_key, max_api_retries=3):
+def _search(params) -> dict:
+    """Runs one SerpApi search (recorded/replayed when an archive is configured)."""
+    key = json.dumps({k: v for k, v in params.items() if k != 'api_key'}, sort_keys=True)
+    return through_archive(
+        'serp',
+        key,
+        lambda: GoogleSearch(params).get_dict(),
+        lambda results: results,
+        lambda results: results,
+        error_factory()
+    )
+
+def serpapi_extractor(keyword, city, start_page, end_page, api_key, max_api_retries=3, ledger=None):
     """
     Fetches SERP data from Google using the SerpApi with retry logic.
+    Every request (retries included) is charged to the optional CostLedger,
+    and extraction stops once its SerpApi credit budget is spent.
     """
     extracted_results = []
     start_index = (start_page - 1) * 10 
@@ -22,16 +37,21 @@ def serpapi_extractor(keyword, city, start_page, end_page, api_key, max_api_retr
                 "num": 10
             }
             
+            if ledger is not None and not ledger.can_search():
+                print("-> SerpApi credit budget exhausted. Stopping extraction.")
+                return extracted_results
+
             try:
-                search = GoogleSearch(params)
-                results = search.get_dict()
+                if ledger is not None:
+                    ledger.record_search('google', 'serp', keyword, city)
+                results = _search(params)
                 
                 if 'error' in results:
                     error_msg = results['error']
                     # Check for rate limit or transient errors
                     if any(err in error_msg.lower() for err in ["rate limit", "internal server error"]):
                         print(f"-> SERP API Transient Error: {error_msg}. Retrying in {2**attempt}s...")
-                        time.sleep(2 ** attempt + random.uniform(0, 1))
+                        pause(2 ** attempt + random.uniform(0, 1))
                         continue # Go to next attempt
                     else:
                         print(f"-> SERP API Fatal Error: {error_msg}")
@@ -66,12 +86,12 @@ def serpapi_extractor(keyword, city, start_page, end_page, api_key, max_api_retr
                         })
                 
                 print(f"-> Fetched 10 results starting at rank {current_rank}.")
-                time.sleep(random.uniform(1, 3)) 
+                pause(random.uniform(1, 3)) 
                 break # Success, break retry loop
 
             except Exception as e:
                 print(f"-> Critical API Request Error: {e.__class__.__name__}. Retrying in {2**attempt}s...")
-                time.sleep(2 ** attempt + random.uniform(0, 1))
+                pause(2 ** attempt + random.uniform(0, 1))
         
         else: # Runs if the inner loop completes without break (all retries failed)
             print(f"-> Max API retries exceeded for rank {current_rank}. Moving to next query.")
@@ -79,16 +99,19 @@ def serpapi_extractor(keyword, city, start_page, end_page, api_key, max_api_retr
             
     return extracted_results
 
-def serpapi_gbp_extractor(keyword, city, api_key, max_api_retries=3) -> dict:
+# GBP fields of a query without a (successful) GBP lookup
+GBP_DEFAULTS = {
+    'GBP_Place_ID': '',
+    'GBP_Rating': 0.0,
+    'GBP_Review_Count': 0
+}
+
+def serpapi_gbp_extractor(keyword, city, api_key, max_api_retries=3, ledger=None) -> dict:
     """
     Fetches the top *competitive* GBP data for a keyword/city query 
     using the dedicated google_local engine.
     """
-    gbp_data = {
-        'GBP_Place_ID': '',  
-        'GBP_Rating': 0.0,
-        'GBP_Review_Count': 0
-    }
+    gbp_data = dict(GBP_DEFAULTS)
     
     params = {
         "api_key": api_key,
@@ -100,15 +123,20 @@ def serpapi_gbp_extractor(keyword, city, api_key, max_api_retries=3) -> dict:
     }
     
     for attempt in range(max_api_retries):
+        if ledger is not None and not ledger.can_search():
+            print("-> SerpApi credit budget exhausted. Skipping GBP lookup.")
+            return gbp_data
+
         try:
-            search = GoogleSearch(params)
-            results = search.get_dict()
+            if ledger is not None:
+                ledger.record_search('google_local', 'gbp', keyword, city)
+            results = _search(params)
             
             if 'error' in results:
                 error_msg = results['error']
                 if any(err in error_msg.lower() for err in ["rate limit", "internal server error"]):
                     print(f"-> SERP API Transient Error: {error_msg}. Retrying in {2**attempt}s...")
-                    time.sleep(2 ** attempt + random.uniform(0.5, 1.5))
+                    pause(2 ** attempt + random.uniform(0.5, 1.5))
                     continue
                 else:
                     print(f"-> SERP API Fatal Error: {error_msg}. Giving up on this query.")
@@ -143,7 +171,7 @@ def serpapi_gbp_extractor(keyword, city, api_key, max_api_retries=3) -> dict:
         except Exception as e:
             error_name = e.__class__.__name__
             print(f"-> General SerpApi Error: {error_name}. Retrying in {2**attempt}s...")
-            time.sleep(2 ** attempt + random.uniform(0.5, 1.5))
+            pause(2 ** attempt + random.uniform(0.5, 1.5))
             continue
             
     print(f"-> GBP data collection failed after {max_api_retries} retries.")
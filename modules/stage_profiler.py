@@ -0,0 +1,96 @@
+import os
+import csv
+import zlib
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from .profiling import URL_PHASES, UrlTimer
+
+
+class StageProfiler:
+    """
+    Built-in --profile mode. Each stage gets:
+    - <stage>.pstats: cProfile stats, accumulated over every time the stage runs
+      (main thread only; concurrent audit workers show up as waiting time, see url_timings.csv)
+    - <stage>_alloc.txt: top-N tracemalloc allocation diff between stage entry and exit
+    Sampled audits also get per-phase timings in url_timings.csv.
+    """
+
+    def __init__(self, output_dir, top_n=25, url_sample_rate=0.1):
+        self.output_dir = output_dir
+        self.top_n = top_n
+        self.url_sample_rate = url_sample_rate
+        self._profiles = {}
+        self._alloc_diffs = {}
+        self._wall_times = {}
+        self._peaks = {}
+        self._url_samples = []
+        self._lock = threading.Lock()
+
+        os.makedirs(output_dir, exist_ok=True)
+        tracemalloc.start(10)
+
+    @contextmanager
+    def stage(self, name):
+        profile = self._profiles.setdefault(name, cProfile.Profile())
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        start = time.perf_counter()
+
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._wall_times[name] = self._wall_times.get(name, 0.0) + time.perf_counter() - start
+            self._peaks[name] = max(self._peaks.get(name, 0), tracemalloc.get_traced_memory()[1])
+
+            after = tracemalloc.take_snapshot()
+            diffs = self._alloc_diffs.setdefault(name, {})
+            for stat in after.compare_to(before, 'lineno'):
+                location = str(stat.traceback[0])
+                size, count = diffs.get(location, (0, 0))
+                diffs[location] = (size + stat.size_diff, count + stat.count_diff)
+
+    def url_timer(self, url):
+        """Returns a UrlTimer for a sampled URL (stable per URL so replays sample the same ones), else None."""
+        if zlib.crc32(url.encode('utf-8')) % 1000 >= self.url_sample_rate * 1000:
+            return None
+        return UrlTimer(self, url)
+
+    def record_url(self, timer):
+        with self._lock:
+            self._url_samples.append(timer)
+
+    def write_reports(self):
+        tracemalloc.stop()
+        print("\n--- PROFILE SUMMARY ---")
+
+        for name, profile in self._profiles.items():
+            profile.dump_stats(os.path.join(self.output_dir, f"{name}.pstats"))
+
+            diffs = sorted(self._alloc_diffs.get(name, {}).items(), key=lambda item: abs(item[1][0]), reverse=True)
+            with open(os.path.join(self.output_dir, f"{name}_alloc.txt"), 'w', encoding='utf-8') as f:
+                f.write(f"Top {self.top_n} allocation changes for stage '{name}'\n")
+                for location, (size, count) in diffs[:self.top_n]:
+                    f.write(f"{size / 1024:+10.1f} KiB {count:+8d} blocks  {location}\n")
+
+            top = pstats.Stats(profile).sort_stats('cumulative')
+            print(f"{name}: {self._wall_times[name]:.2f}s wall, peak {self._peaks[name] / 1024 / 1024:.1f} MiB, "
+                  f"{top.total_calls} calls")
+
+        if self._url_samples:
+            with open(os.path.join(self.output_dir, "url_timings.csv"), 'w', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['URL'] + URL_PHASES + ['total'])
+                for timer in self._url_samples:
+                    writer.writerow([timer.url] + [f"{timer.timings.get(phase, 0.0):.4f}" for phase in URL_PHASES + ['total']])
+
+            for phase in URL_PHASES:
+                average = sum(t.timings.get(phase, 0.0) for t in self._url_samples) / len(self._url_samples)
+                print(f"   audit/{phase}: {average:.3f}s avg over {len(self._url_samples)} sampled URLs")
+
+        print(f"Profile files written to {self.output_dir} (open .pstats with `python -m pstats`)")
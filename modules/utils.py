@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from .constants import DIRECTORY_DOMAINS
 
@@ -44,7 +45,7 @@ def clean_and_deduplicate(raw_data):
     return df_cleaned
 
 def _get_rating_score(rating, reviews) -> str:
-    """Classifies the GBP status for pitch generation."""
+    """Classifies the GBP status for pitch generation (row-wise reference for gbp_status, see tests/test_scoring.py)."""
     if rating >= 4.5 and reviews >= 50:
         return "Strong" # Winning on reputation
     elif rating >= 4.0 and reviews >= 10:
@@ -57,6 +58,7 @@ def _get_rating_score(rating, reviews) -> str:
 def is_actionable(row):
     """
     Determines if a prospect is actionable based on Data Columns.
+    Row-wise reference for actionable_mask (see tests/test_scoring.py and bench/bench_scoring.py).
     """
     # 1. MANDATORY: Check for Email
     email = row.get('Email_Address')
@@ -85,3 +87,82 @@ def is_actionable(row):
 
     # 6. YES: Healthy Site (Authority Pitch)
     return 'YES'
+
+# Points added to Lead_Priority_Score for each audit gap (bigger gap = easier pitch)
+PRIORITY_WEIGHTS = {
+    'Robots_Status': 30,
+    'Error_Status': 25,
+    'H1_Audit_Result': 15,
+    'NAP_Audit_Result': 15,
+    'Schema_Issue': 10,
+    'Title_Status': 5,
+    'Meta_Desc_Status': 5,
+}
+GBP_STATUS_WEIGHTS = {'Missing': 10, 'Weak': 10, 'Decent': 5, 'Strong': 0}
+
+def _text_column(df, column):
+    """Returns a column as strings (missing column or NaN -> ''), mirroring str(row.get(...))."""
+    if column not in df.columns:
+        return pd.Series('', index=df.index)
+    return df[column].fillna('').astype(str)
+
+def _numeric_column(df, column):
+    if column not in df.columns:
+        return pd.Series(np.nan, index=df.index)
+    return pd.to_numeric(df[column], errors='coerce')
+
+def actionable_mask(df) -> pd.Series:
+    """
+    Vectorized version of is_actionable: True when the row has a usable email
+    and was not marked as SKIP. Every other branch of the rules ends in 'YES'.
+    """
+    if 'Email_Address' not in df.columns:
+        return pd.Series(False, index=df.index)
+
+    email = df['Email_Address']
+    mask = email.notna() & (email != '') & (email != 'N/A')
+
+    if 'Final_Pitch' in df.columns:
+        mask &= df['Final_Pitch'] != "SKIP"
+
+    return mask
+
+def gbp_status(df) -> pd.Series:
+    """Vectorized version of _get_rating_score over the GBP_Rating/GBP_Review_Count columns."""
+    rating = _numeric_column(df, 'GBP_Rating')
+    reviews = _numeric_column(df, 'GBP_Review_Count')
+
+    conditions = [
+        (rating >= 4.5) & (reviews >= 50),
+        (rating >= 4.0) & (reviews >= 10),
+        (rating > 0) & (reviews > 0),
+    ]
+    return pd.Series(np.select(conditions, ["Strong", "Decent", "Weak"], default="Missing"), index=df.index)
+
+def score_leads(df):
+    """
+    Column-wise lead scoring. Adds:
+    - Actionable_Target ('YES'/'NO', same rules as is_actionable)
+    - GBP_Status (same bands as _get_rating_score)
+    - Lead_Priority_Score (0 for non-actionable rows, higher = better pitch)
+    """
+    actionable = actionable_mask(df)
+    df['Actionable_Target'] = np.where(actionable, 'YES', 'NO')
+    df['GBP_Status'] = gbp_status(df)
+
+    score = pd.Series(0.0, index=df.index)
+    for column, weight in PRIORITY_WEIGHTS.items():
+        if column == 'Error_Status':
+            gap = _text_column(df, column).str.contains('Error', regex=False)
+        else:
+            gap = _text_column(df, column).str.contains('Fail', regex=False)
+        score += gap * weight
+
+    score += df['GBP_Status'].map(GBP_STATUS_WEIGHTS)
+
+    # Sites already close to page 1 are the easiest wins
+    rank = _numeric_column(df, 'Rank').fillna(100).clip(1, 100)
+    score += (100 - rank) / 10
+
+    df['Lead_Priority_Score'] = score.where(actionable, 0.0).round(1)
+    return df
@@ -0,0 +1,72 @@
+import time
+import random
+import requests
+from modules import replay, crawler
+from modules.crawler import run_on_page_audit, fetch_contact_page
+from modules.contact_discovery import ContactDiscovery
+
+SITES = [f'https://site{i}.com/' for i in range(12)]
+
+HOMEPAGE = '<html><head><title>Diesel Repair Shop</title></head><body><h1>Diesel repair</h1><a href="/contact-us">Contact us</a></body></html>'
+
+# Several candidate pages carry an email, so the winner depends on how it is picked
+PAGES = {
+    'contact': '<a href="mailto:office@{host}">Email</a>',
+    'contact-us': '<a href="mailto:hello@{host}">Email</a>',
+    'about-us': '<p>Write to sales@{host}</p>',
+}
+
+
+def _response(url, status, body):
+    response = requests.Response()
+    response.status_code = status
+    response.url = url
+    response.encoding = 'utf-8'
+    response._content = body.encode('utf-8')
+    return response
+
+
+def _fake_get(url, headers=None, timeout=None):
+    # Random latency: candidates finish in a different order on every live run
+    time.sleep(random.uniform(0, 0.02))
+    host = url.split('/')[2]
+    path = url.split('/', 3)[3].strip('/')
+    if not path:
+        return _response(url, 200, HOMEPAGE)
+    if path in PAGES:
+        return _response(url, 200, PAGES[path].format(host=host))
+    return _response(url, 404, '')
+
+
+def _audit_all(cache_path):
+    discovery = ContactDiscovery(fetch_contact_page, cache_path=cache_path)
+    try:
+        emails = {url: run_on_page_audit(url, 'diesel repair', 'Midland, Texas', contact_discovery=discovery)['Email_Address']
+                  for url in SITES}
+    finally:
+        discovery.close()
+    return emails, dict(discovery.cache)
+
+
+def test_replay_picks_the_same_contact_pages(tmp_path, monkeypatch):
+    monkeypatch.setattr(crawler.requests, 'get', _fake_get)
+    archive_dir = str(tmp_path / 'archive')
+
+    replay.configure(record_dir=archive_dir)
+    try:
+        recorded_emails, recorded_cache = _audit_all(str(tmp_path / 'record_cache.json'))
+    finally:
+        replay.close()
+
+    # Candidates are accepted in fixed order: /contact wins whenever it has an email
+    assert recorded_emails == {url: f"office@{url.split('/')[2]}" for url in SITES}
+
+    for run in range(3):
+        replay.configure(replay_dir=archive_dir)
+        try:
+            replayed_emails, replayed_cache = _audit_all(str(tmp_path / f'replay_cache_{run}.json'))
+        finally:
+            replay.close()
+
+        assert replayed_emails == recorded_emails
+        assert replayed_cache == recorded_cache
@@ -0,0 +1,29 @@
+import pandas as pd
+from modules.entities import registrable_domain, resolve_entities
+
+
+def test_registrable_domain():
+    assert registrable_domain('https://midland.acme-diesel.com/contact') == 'acme-diesel.com'
+    assert registrable_domain('https://www.acme.co.uk/') == 'acme.co.uk'
+    assert registrable_domain('http://127.0.0.1:8000/') == '127.0.0.1'
+    assert registrable_domain('') is None
+
+
+def test_primary_is_audited_row_with_email():
+    df = pd.DataFrame([
+        {'URL': 'https://acme.com/', 'Rank': 1, 'Email_Address': 'N/A', 'Phone_Number': 'N/A',
+         'Error_Status': 'Skipped: Not Audited'},
+        {'URL': 'https://acme.com/blog', 'Rank': 2, 'Email_Address': 'N/A', 'Phone_Number': 'N/A',
+         'Error_Status': 'Blocked'},
+        {'URL': 'https://acme.com/services', 'Rank': 4, 'Email_Address': 'info@acme.com',
+         'Phone_Number': '432-555-1234', 'Error_Status': 'Success'},
+        {'URL': 'https://other.com/', 'Rank': 3, 'Email_Address': 'N/A', 'Phone_Number': 'N/A',
+         'Error_Status': 'Success'},
+    ])
+
+    resolved = resolve_entities(df)
+    primaries = resolved[resolved['Is_Entity_Primary']].set_index('URL')
+
+    assert list(primaries.index) == ['https://acme.com/services', 'https://other.com/']
+    assert primaries.loc['https://acme.com/services', 'Rank'] == 1  # Entity's best Rank
+    assert resolved['Entity_ID'].nunique() == 2
@@ -0,0 +1,69 @@
+import pytest
+from modules.fingerprint import simhash, hamming_distance, SimHashIndex
+
+TEMPLATE = (
+    "Welcome to {company} mobile diesel repair in {city}. Our certified mechanics come to your "
+    "job site, yard or roadside with fully stocked service trucks. We repair engines, transmissions, "
+    "brakes, hydraulics and electrical systems on semi trucks, trailers, heavy equipment and fleet "
+    "vehicles. Call {phone} for fast emergency roadside assistance around the clock. We keep your "
+    "fleet moving with preventive maintenance programs, DOT inspections and honest upfront pricing. "
+    "Serving owner operators and fleets across {city} and the surrounding counties for over twenty years. "
+    "Our shop handles overhauls, turbo replacements, injector service, aftertreatment cleaning and "
+    "diagnostics for Cummins, Detroit, Paccar and Caterpillar engines. Every technician carries laptop "
+    "diagnostic software and the parts most often needed on the road, so most repairs finish in a single "
+    "visit. Oilfield operators rely on us for pump trucks, frac support units, pickups and generators. "
+    "We offer net thirty billing for approved commercial accounts, detailed digital invoices with photos, "
+    "and a written warranty on parts and labor. Ask about discounted rates for multi truck fleet plans, "
+    "scheduled weekend service windows and after hours yard maintenance that keeps drivers on schedule."
+)
+
+
+def _page(city='Midland', phone='432-555-0101', company='Acme'):
+    return TEMPLATE.format(city=city, phone=phone, company=company)
+
+
+def test_city_and_phone_swaps_hash_identically():
+    original = simhash(_page(), ignore_words=['Midland'])
+    clone = simhash(_page(city='Odessa', phone='432-555-0199'), ignore_words=['Odessa'])
+    assert original is not None
+    assert hamming_distance(original, clone) == 0
+
+
+def test_near_clone_matches_within_distance():
+    index = SimHashIndex(max_distance=3)
+    original = simhash(_page(), ignore_words=['Midland'])
+    clone = simhash(_page(city='Odessa', phone='432-555-0199', company='Delta'), ignore_words=['Odessa'])
+    unrelated = simhash(
+        "Sunrise Bakery bakes sourdough, croissants and custom birthday cakes every morning. "
+        "Order wedding cakes online, pick up fresh bread downtown, and join our weekend baking "
+        "classes for kids and adults. Gluten free and vegan options are available daily, and our "
+        "coffee bar serves espresso drinks roasted locally by a family farm cooperative since the "
+        "early nineties. Catering trays, cookie boxes and pastry platters ship same day."
+    )
+
+    assert index.find_or_add(original, 'https://acme.com/') is None
+    assert hamming_distance(original, clone) <= 3
+    assert index.find_or_add(clone, 'https://acme-odessa.com/') == 'https://acme.com/'
+    assert index.find(unrelated) is None
+
+
+def test_find_or_add_indexes_only_new_sites():
+    index = SimHashIndex(max_distance=3)
+    fingerprint = simhash(_page())
+
+    assert index.find(fingerprint) is None
+    assert index.find_or_add(fingerprint, 'a') is None
+    assert index.find_or_add(fingerprint, 'b') == 'a'
+    assert index.find(fingerprint) == 'a'  # 'b' was a duplicate, not indexed
+
+
+def test_thin_pages_are_not_fingerprinted():
+    assert simhash("You need to enable JavaScript to run this app.") is None
+    assert simhash("Coming soon! This domain is parked.") is None
+    assert simhash("") is None
+
+
+@pytest.mark.parametrize('distance', [-1, 64])
+def test_index_rejects_out_of_range_distance(distance):
+    with pytest.raises(ValueError):
+        SimHashIndex(max_distance=distance)
@@ -0,0 +1,57 @@
+import pytest
+from modules.queries import parse_shard, normalize_query, iter_queries, iter_batches
+
+
+def test_parse_shard():
+    assert parse_shard('2/4') == (2, 4)
+    assert parse_shard(' 1 / 1 ') == (1, 1)
+
+
+@pytest.mark.parametrize('value', ['0/4', '5/4', '1/0', '2', 'a/b', ''])
+def test_parse_shard_rejects_invalid(value):
+    with pytest.raises(ValueError):
+        parse_shard(value)
+
+
+def test_normalize_query_drops_trailing_city():
+    assert normalize_query('  diesel   repair midland ', 'Midland, Texas') == (
+        'diesel repair', 'Midland, Texas', ('diesel repair', 'midland, texas')
+    )
+    assert normalize_query('', 'Midland, Texas') is None
+
+
+def test_iter_queries_dedupes_overlaps(tmp_path):
+    queries = tmp_path / 'queries.csv'
+    queries.write_text(
+        'keyword,city\n'
+        'diesel repair,"Midland, Texas"\n'
+        'Diesel Repair Midland,"Midland, Texas"\n'
+        'diesel  repair,"midland, texas"\n'
+        'mobile mechanic,"Odessa, Texas"\n',
+        encoding='utf-8'
+    )
+    assert list(iter_queries(str(queries))) == [('diesel repair', 'Midland, Texas'), ('mobile mechanic', 'Odessa, Texas')]
+
+
+def test_iter_queries_reads_excel_bom_csv(tmp_path):
+    queries = tmp_path / 'queries.csv'
+    queries.write_bytes('\ufeffkeyword,city\ndiesel repair,"Midland, Texas"\n'.encode('utf-8'))
+    assert list(iter_queries(str(queries))) == [('diesel repair', 'Midland, Texas')]
+
+
+def test_shards_partition_the_grid(tmp_path):
+    keywords = tmp_path / 'keywords.txt'
+    cities = tmp_path / 'cities.txt'
+    keywords.write_text('\n'.join(f'keyword {i}' for i in range(20)), encoding='utf-8')
+    cities.write_text('\n'.join(f'City {i}, Texas' for i in range(15)), encoding='utf-8')
+
+    full = list(iter_queries(keywords_file=str(keywords), cities_file=str(cities)))
+    shards = [list(iter_queries(keywords_file=str(keywords), cities_file=str(cities), shard=(i, 4))) for i in range(1, 5)]
+
+    assert len(full) == 300
+    assert sorted(q for shard in shards for q in shard) == sorted(full)  # each query in exactly one shard
+    assert all(shard for shard in shards)
+
+
+def test_iter_batches():
+    assert list(iter_batches(iter(range(5)), size=2)) == [[0, 1], [2, 3], [4]]
@@ -0,0 +1,55 @@
+import pandas as pd
+from modules.scheduler import prioritize_prospects, run_scheduled_audits
+
+
+def _prospects(count):
+    return pd.DataFrame({
+        'URL': [f'https://shop{i}.com/' for i in range(count)],
+        'Rank': list(range(1, count + 1)),
+    })
+
+
+def test_prioritize_prefers_homepages_with_contact_signals():
+    df = pd.DataFrame([
+        {'URL': 'https://directory.com/best/diesel/midland', 'Rank': 1,
+         'Title': 'Top 10 Best Diesel Mechanics in Midland', 'Snippet': 'Compare reviews'},
+        {'URL': 'https://acme.com/', 'Rank': 5,
+         'Title': 'Acme Diesel Repair', 'Snippet': 'Call us at (432) 555-0101'},
+        {'URL': 'https://quiet.com/', 'Rank': 3,
+         'Title': 'Quiet Diesel', 'Snippet': 'Mobile diesel service'},
+        {'URL': 'https://cached.com/', 'Rank': 9,
+         'Title': 'Cached Diesel', 'Snippet': 'Mobile diesel service'},
+    ])
+
+    ordered = prioritize_prospects(df, known_contact_domains={'cached.com'})
+
+    assert list(ordered['URL']) == [
+        'https://acme.com/', 'https://cached.com/', 'https://quiet.com/', 'https://directory.com/best/diesel/midland'
+    ]
+    assert ordered['Audit_Priority'].between(0, 100).all()
+
+
+def test_target_stops_new_submissions():
+    started = []
+
+    def audit(row, cancel_event):
+        started.append(row['URL'])
+        return {'Email_Address': f"info@{row['URL'][8:-1]}", 'Error_Status': 'Success'}
+
+    results = list(run_scheduled_audits(_prospects(10), audit, target_leads=3, workers=1))
+
+    assert len(results) == 3
+    assert started == [f'https://shop{i}.com/' for i in range(3)]
+
+
+def test_cancelled_results_are_dropped():
+    def audit(row, cancel_event):
+        if row['Rank'] == 1:
+            return {'Email_Address': 'info@shop0.com', 'Error_Status': 'Success'}
+        # In flight when the target is reached: stops early and reports Cancelled
+        cancel_event.wait(timeout=5)
+        return {'Email_Address': 'N/A', 'Error_Status': 'Cancelled'}
+
+    results = list(run_scheduled_audits(_prospects(4), audit, target_leads=1, workers=2))
+
+    assert [index for index, _ in results] == [0]
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+from modules.utils import score_leads, is_actionable, _get_rating_score
+
+ROWS = 5000
+
+TEXT_VALUES = {
+    'Email_Address': ['info@acme.com', 'owner@shop.net', 'N/A', '', np.nan, None],
+    'Final_Pitch': ['', 'SKIP', np.nan],
+    'Robots_Status': ['Pass: Index/Follow', 'Fail: NOINDEX tag found', '', np.nan],
+    'Error_Status': ['Success', 'Error: ConnectTimeout', 'Blocked', 'Skipped: Not Audited', '', np.nan],
+    'H1_Audit_Result': ['Pass: Diesel Repair Midland...', 'Fail: H1 Missing or Empty', 'N/A', np.nan],
+    'NAP_Audit_Result': ['Pass: Address/Phone Found', 'Fail: NAP Info Not Found/Clear', '', np.nan],
+    'Schema_Issue': ['Pass: LocalBusiness/Organization Schema Found', 'Fail: No LocalBusiness Schema Found', np.nan],
+    'Title_Status': ['Pass: Acme Diesel...', 'Fail: Weak/Default Title Tag', ''],
+    'Meta_Desc_Status': ['Pass: Mobile diesel...', 'Fail: Missing Meta Description', np.nan],
+}
+NUMERIC_VALUES = {
+    'GBP_Rating': [0, 3.2, 4.0, 4.4, 4.5, 5.0, 'N/A', '', np.nan],
+    'GBP_Review_Count': [0, 1, 9, 10, 49, 50, 300, 'N/A', '', np.nan],
+    'Rank': [1, 5, 10, 37, 100, np.nan],
+}
+
+
+@pytest.fixture
+def leads():
+    rng = np.random.default_rng(27)
+    data = {
+        column: [values[i] for i in rng.integers(0, len(values), ROWS)]
+        for column, values in {**TEXT_VALUES, **NUMERIC_VALUES}.items()
+    }
+    return pd.DataFrame(data)
+
+
+def _reference_rating(row):
+    # The scalar helper expects numbers; 'N/A'/'' ratings count as missing (NaN)
+    rating = pd.to_numeric(row['GBP_Rating'], errors='coerce')
+    reviews = pd.to_numeric(row['GBP_Review_Count'], errors='coerce')
+    return _get_rating_score(rating, reviews)
+
+
+def test_actionable_target_matches_row_rules(leads):
+    expected = leads.apply(is_actionable, axis=1)
+    scored = score_leads(leads.copy())
+    assert (scored['Actionable_Target'] == expected).all()
+
+
+def test_gbp_status_matches_rating_bands(leads):
+    expected = leads.apply(_reference_rating, axis=1)
+    scored = score_leads(leads.copy())
+    assert (scored['GBP_Status'] == expected).all()
+
+
+def test_priority_score_only_for_actionable_rows(leads):
+    scored = score_leads(leads.copy())
+    actionable = scored['Actionable_Target'] == 'YES'
+
+    assert (scored.loc[~actionable, 'Lead_Priority_Score'] == 0).all()
+    assert (scored.loc[actionable, 'Lead_Priority_Score'] >= 0).all()
+    assert scored['Lead_Priority_Score'].notna().all()
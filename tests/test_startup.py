@@ -0,0 +1,58 @@
+import os
+import re
+import sys
+import time
+import subprocess
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Stage dependencies that must only load once a stage actually runs
+HEAVY_MODULES = ['pandas', 'bs4', 'serpapi', 'google.generativeai']
+
+# Profiler internals, only loaded with --profile
+PROFILER_MODULES = ['cProfile', 'pstats', 'tracemalloc']
+
+# Generous ceilings: the lazy CLI starts in ~0.2s, an eager one pays for pandas/genai (>1s)
+MAX_HELP_SECONDS = 3.0
+MAX_IMPORT_MICROSECONDS = 500_000
+
+
+def _run(args):
+    return subprocess.run(
+        [sys.executable] + args,
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        timeout=60
+    )
+
+
+def test_cli_import_skips_stage_and_profiler_dependencies():
+    check = (
+        "import sys, agent; "
+        f"print(','.join(m for m in {HEAVY_MODULES + PROFILER_MODULES!r} if m in sys.modules))"
+    )
+    result = _run(['-c', check])
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ''
+
+
+def test_cli_import_time():
+    result = _run(['-X', 'importtime', '-c', 'import agent'])
+    assert result.returncode == 0, result.stderr
+
+    match = re.search(r'^import time:\s*\d+\s*\|\s*(\d+)\s*\|\s*agent$', result.stderr, re.MULTILINE)
+    assert match, result.stderr[-500:]
+    assert int(match.group(1)) < MAX_IMPORT_MICROSECONDS
+
+
+@pytest.mark.parametrize('stage', ['serp', 'audit', 'report'])
+def test_subcommand_help_is_fast(stage):
+    start = time.perf_counter()
+    result = _run(['agent.py', stage, '--help'])
+    elapsed = time.perf_counter() - start
+
+    assert result.returncode == 0, result.stderr
+    assert 'usage:' in result.stdout
+    assert elapsed < MAX_HELP_SECONDS